@@ -0,0 +1,314 @@
+"""
+Precomputed STATE_UT -> DISTRICT -> BLOCK -> VILLAGE x month aggregates.
+
+The cube holds, for every node of the location hierarchy and every month,
+the DTWL count/sum/min/max and the recharge (previous reading minus the
+reading, as on the dashboards) summed over the month. Village rows are built
+with one grouped diff over the whole dataset; the higher levels are rolled up
+from them. Sums and counts are kept instead of means so rows can be merged.
+
+    python aggregates.py                 # build and save the cube
+    python aggregates.py --district Guntur
+
+The cube is saved next to the dataset and reused while it is newer than the
+CSV and the live log. AggregateCube.update() folds in new readings by adding
+them to the village-month rows they fall in and the block, district and state
+rows above, without touching the rest of the cube (new rows are appended, so
+an updated cube is no longer sorted). get_cube() applies live readings this way.
+"""
+import argparse
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data_access import dataset_path, live_path, load_dataset
+
+cube_path = "/Users/sruthiuma/Documents/PrototypeSIH/dataset/monsoon_cube.parquet"
+
+LEVELS = ["STATE_UT", "DISTRICT", "BLOCK", "VILLAGE"]
+
+_lock = threading.Lock()
+_cube = None
+
+
+def _readings(df):
+    """Readings with location keys, Month and the recharge since the village's previous reading."""
+    readings = pd.DataFrame({col: df[col].astype(str).str.strip() for col in LEVELS})
+    readings["Date"] = pd.to_datetime(df["Date"]).to_numpy()
+    readings["DTWL"] = df["DTWL"].to_numpy(dtype=np.float64)
+    readings = readings.sort_values(LEVELS + ["Date"], kind="stable").reset_index(drop=True)
+    readings["Recharge"] = -readings.groupby(LEVELS, sort=False)["DTWL"].diff()
+    readings["Month"] = readings["Date"].dt.to_period("M").dt.to_timestamp()
+    return readings
+
+
+def _village_months(readings):
+    """One row per village and month; last_date/last_dtwl carry the recharge into later readings."""
+    grouped = readings.groupby(LEVELS + ["Month"], sort=False)
+    base = grouped.agg(
+        readings=("DTWL", "size"),
+        dtwl_sum=("DTWL", "sum"),
+        dtwl_min=("DTWL", "min"),
+        dtwl_max=("DTWL", "max"),
+        recharge_sum=("Recharge", "sum"),
+        recharge_n=("Recharge", "count"),
+        last_date=("Date", "last"),
+        last_dtwl=("DTWL", "last"),
+    ).reset_index()
+    base["villages"] = 1
+    return base
+
+
+def _rollup(base, level):
+    """Aggregate village-month rows to the given hierarchy level."""
+    keys = LEVELS[:LEVELS.index(level) + 1]
+    rolled = base.groupby(keys + ["Month"], sort=False).agg(
+        villages=("villages", "sum"),
+        readings=("readings", "sum"),
+        dtwl_sum=("dtwl_sum", "sum"),
+        dtwl_min=("dtwl_min", "min"),
+        dtwl_max=("dtwl_max", "max"),
+        recharge_sum=("recharge_sum", "sum"),
+        recharge_n=("recharge_n", "sum"),
+    ).reset_index()
+    for col in LEVELS[len(keys):]:
+        rolled[col] = ""
+    return rolled
+
+
+def _stack(base):
+    """The full cube: village rows plus every higher level, with a level column."""
+    frames = [base.assign(level="VILLAGE")]
+    for level in LEVELS[:-1]:
+        frames.append(_rollup(base, level).assign(level=level))
+    cube = pd.concat(frames, ignore_index=True)
+    return cube.sort_values(["level"] + LEVELS + ["Month"], kind="stable").reset_index(drop=True)
+
+
+def _replace(old, new):
+    return new
+
+
+class AggregateCube:
+    """Monthly DTWL and recharge aggregates at every level of the location hierarchy."""
+
+    def __init__(self, cube):
+        self.cube = cube
+        self._lock = threading.Lock()
+        # Row position per (level, hierarchy keys, month) and latest (date, DTWL) per village,
+        # built on the first update()
+        self._positions = None
+        self._latest = None
+
+    @classmethod
+    def build(cls, df):
+        return cls(_stack(_village_months(_readings(df))))
+
+    def _index(self):
+        cube = self.cube
+        months = cube["Month"].to_numpy().astype("datetime64[ns]").astype("int64")
+        self._positions = {
+            key: i for i, key in enumerate(zip(cube["level"], *(cube[col] for col in LEVELS), months))
+        }
+        villages = cube[cube["level"] == "VILLAGE"].sort_values("last_date", kind="stable")
+        dates = villages["last_date"].to_numpy().astype("datetime64[ns]").astype("int64")
+        self._latest = {
+            tuple(key): (date, dtwl)
+            for *key, date, dtwl in zip(*(villages[col] for col in LEVELS), dates, villages["last_dtwl"])
+        }
+
+    def update(self, new_rows):
+        """Fold in new readings; returns the months whose rows changed.
+
+        Counts and sums are added to the village row of each reading's month
+        and to the block, district and state rows above it, and min/max are
+        widened, so the rest of the cube is left as it is. Readings must be
+        newer than their village's latest reading in the cube (new months
+        arriving); anything older needs a rebuild.
+        """
+        readings = pd.DataFrame({col: new_rows[col].astype(str).str.strip().to_numpy() for col in LEVELS})
+        readings["Date"] = pd.to_datetime(new_rows["Date"]).to_numpy().astype("datetime64[ns]")
+        readings["DTWL"] = new_rows["DTWL"].to_numpy(dtype=np.float64)
+        if readings.empty:
+            return pd.DatetimeIndex([])
+        readings = readings.sort_values("Date", kind="stable")
+        months = readings["Date"].dt.to_period("M").dt.to_timestamp()
+        rows = list(zip(zip(*(readings[col] for col in LEVELS)), readings["Date"].to_numpy().astype("int64"),
+                        months.to_numpy().astype("datetime64[ns]").astype("int64"), readings["DTWL"]))
+
+        with self._lock:
+            if self._positions is None:
+                self._index()
+            latest = dict(self._latest)
+            for village, date, _, _ in rows:
+                if village in self._latest and date <= self._latest[village][0]:
+                    raise ValueError("Readings older than the cube's latest for their village; rebuild the cube")
+
+            cube = self.cube
+            columns = {col: cube[col].to_numpy().copy() for col in
+                       ["readings", "dtwl_sum", "dtwl_min", "dtwl_max", "recharge_sum", "recharge_n",
+                        "villages", "last_date", "last_dtwl"]}
+            columns["last_date"] = columns["last_date"].astype("datetime64[ns]").astype("int64")
+            positions = dict(self._positions)
+            size, added = len(cube), []
+
+            def row(key):
+                pos = positions.get(key)
+                if pos is None:
+                    pos = positions[key] = size + len(added)
+                    added.append({"level": key[0], **dict(zip(LEVELS, key[1:-1])), "Month": key[-1],
+                                  "readings": 0, "dtwl_sum": 0.0, "dtwl_min": np.inf, "dtwl_max": -np.inf,
+                                  "recharge_sum": 0.0, "recharge_n": 0, "villages": 0,
+                                  "last_date": np.iinfo(np.int64).min, "last_dtwl": np.nan})
+                return pos
+
+            def add(pos, col, value, combine=np.add):
+                if pos < size:
+                    columns[col][pos] = combine(columns[col][pos], value)
+                else:
+                    added[pos - size][col] = combine(added[pos - size][col], value)
+
+            for village, date, month, dtwl in rows:
+                # Recharge is the previous reading minus this one, as on the dashboards
+                prior = latest.get(village)
+                recharge = prior[1] - dtwl if prior is not None else np.nan
+                latest[village] = (date, dtwl)
+
+                new_village_month = (("VILLAGE",) + village + (month,)) not in positions
+                for depth, level in enumerate(LEVELS, start=1):
+                    pos = row((level,) + village[:depth] + ("",) * (len(LEVELS) - depth) + (month,))
+                    add(pos, "readings", 1)
+                    add(pos, "dtwl_sum", dtwl)
+                    add(pos, "dtwl_min", dtwl, np.minimum)
+                    add(pos, "dtwl_max", dtwl, np.maximum)
+                    if not np.isnan(recharge):
+                        add(pos, "recharge_sum", recharge)
+                        add(pos, "recharge_n", 1)
+                    if new_village_month:
+                        add(pos, "villages", 1)
+                    if level == "VILLAGE":
+                        # Readings are in date order and newer than the village's, so each is its latest
+                        add(pos, "last_date", date, _replace)
+                        add(pos, "last_dtwl", dtwl, _replace)
+
+            updated = cube.assign(**{col: values for col, values in columns.items() if col != "last_date"},
+                                  last_date=columns["last_date"].astype("datetime64[ns]"))
+            if added:
+                new = pd.DataFrame(added)
+                new["Month"] = new["Month"].astype("datetime64[ns]")
+                new["last_date"] = new["last_date"].astype("datetime64[ns]")
+                updated = pd.concat([updated, new[cube.columns]], ignore_index=True)
+            # Swapped whole so queries see the cube either before or after the readings
+            self.cube = updated
+            self._positions, self._latest = positions, latest
+        return pd.DatetimeIndex(np.unique(months))
+
+    def series(self, level, start_date=None, end_date=None, **keys):
+        """Monthly rows for one node, e.g. series("DISTRICT", DISTRICT="Guntur"), with mean and recharge."""
+        rows = self._select(level, start_date, end_date, **keys)
+        return self._summarize(rows).sort_values("Month").reset_index(drop=True)
+
+    def children(self, level, start_date=None, end_date=None, **keys):
+        """One row per node at level under keys, summarized over the date range."""
+        rows = self._select(level, start_date, end_date, **keys)
+        names = LEVELS[:LEVELS.index(level) + 1]
+        grouped = rows.groupby(names, sort=True, observed=True).agg(
+            villages=("villages", "max"),
+            readings=("readings", "sum"),
+            dtwl_sum=("dtwl_sum", "sum"),
+            dtwl_min=("dtwl_min", "min"),
+            dtwl_max=("dtwl_max", "max"),
+            recharge_sum=("recharge_sum", "sum"),
+            recharge_n=("recharge_n", "sum"),
+        ).reset_index()
+        return self._summarize(grouped)
+
+    def _select(self, level, start_date, end_date, **keys):
+        if level not in LEVELS:
+            raise ValueError(f"Unknown level: {level}")
+        cube = self.cube
+        mask = (cube["level"] == level).to_numpy()
+        for col, value in keys.items():
+            mask &= (cube[col] == value).to_numpy()
+        if start_date is not None:
+            mask &= (cube["Month"] >= pd.Timestamp(start_date).to_period("M").to_timestamp()).to_numpy()
+        if end_date is not None:
+            mask &= (cube["Month"] <= pd.Timestamp(end_date)).to_numpy()
+        return cube[mask]
+
+    @staticmethod
+    def _summarize(rows):
+        out = rows.drop(columns=["level", "last_date", "last_dtwl"], errors="ignore").copy()
+        out["dtwl_mean"] = out["dtwl_sum"] / out["readings"]
+        out["recharge_mean"] = out["recharge_sum"] / out["recharge_n"].where(out["recharge_n"] > 0)
+        return out.drop(columns=["dtwl_sum"])
+
+    def save(self, path=cube_path):
+        tmp_path = path + ".tmp"
+        self.cube.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=cube_path):
+        return cls(pd.read_parquet(path))
+
+
+def cube_is_fresh(path=cube_path, csv_path=dataset_path):
+    """True if the saved cube is at least as new as the CSV and the live log."""
+    if not os.path.exists(path):
+        return False
+    sources = [p for p in (csv_path, live_path) if os.path.exists(p)]
+    return all(os.path.getmtime(path) >= os.path.getmtime(p) for p in sources)
+
+
+def get_cube(path=cube_path):
+    """The process-wide cube: the saved one if fresh, otherwise built from the dataset and saved.
+
+    Live readings applied to the dataset afterwards are folded in with update().
+    """
+    global _cube
+    if _cube is None:
+        with _lock:
+            if _cube is None:
+                dataset = load_dataset()
+                version = dataset.version
+                if cube_is_fresh(path):
+                    cube = AggregateCube.load(path)
+                else:
+                    cube = AggregateCube.build(dataset.df)
+                    cube.save(path)
+
+                def apply(rows):
+                    global _cube
+                    with _lock:
+                        try:
+                            _cube.update(rows)
+                        except ValueError:
+                            # Back-dated readings (or ones the cube already has) change later recharge values; rebuild
+                            _cube = AggregateCube.build(dataset.df)
+
+                _cube = cube
+                dataset.subscribe(apply)
+                # Readings applied while the cube was loaded or built
+                if dataset.version != version:
+                    _cube = AggregateCube.build(dataset.df)
+    return _cube
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the district/block/village monthly aggregate cube")
+    parser.add_argument("--out", default=cube_path, help="where to save the cube")
+    parser.add_argument("--district", help="print the blocks of this district instead of all districts")
+    args = parser.parse_args()
+
+    cube = AggregateCube.build(load_dataset().df)
+    cube.save(args.out)
+    print(f"✅ Saved {len(cube.cube)} aggregate rows to {args.out}")
+
+    if args.district:
+        table = cube.children("BLOCK", DISTRICT=args.district)
+    else:
+        table = cube.children("DISTRICT")
+    print(table.to_string(index=False))
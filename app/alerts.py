@@ -0,0 +1,263 @@
+"""
+Critical groundwater level alerts for every village at once.
+
+AlertScanner.scan() takes the whole dataset, forecasts every village in one
+batch and computes, per village, the first date the depth to water level
+falls below its threshold, the minimum depth and the number of months below
+the threshold, over both the observed history and the forecast. Thresholds
+can be set per village or per district, falling back to CRITICAL_THRESHOLD.
+
+New readings are folded in with AlertScanner.update(): only the villages
+that received readings have their history aggregates merged and their
+forecasts recomputed.
+
+    python alerts.py --top 25
+    python alerts.py --thresholds thresholds.csv --out alerts.csv
+"""
+import argparse
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data_access import load_dataset
+from predict_future import predict_from_lags
+
+CRITICAL_THRESHOLD = 3.0  # meters for alerts
+
+FORECAST_START = "2025-01-01"
+FORECAST_END = "2026-12-31"
+
+ALERT_COLUMNS = [
+    "VILLAGE", "DISTRICT", "threshold", "first_breach", "min_depth", "months_below",
+    "latest_date", "latest_depth", "critical_now",
+]
+
+
+def _periods(dates):
+    # Calendar month as a single integer, for counting distinct months
+    return dates.dt.year * 12 + dates.dt.month
+
+
+def _readings(frame):
+    """(key, VILLAGE, DISTRICT, Date, value) rows sorted by village and date; key is the lowercase name."""
+    villages = frame["VILLAGE"].astype(str).str.strip()
+    districts = frame["DISTRICT"].astype(str) if "DISTRICT" in frame else pd.Series("", index=frame.index)
+    readings = pd.DataFrame({
+        "key": villages.str.lower().to_numpy(),
+        "VILLAGE": villages.to_numpy(),
+        "DISTRICT": districts.to_numpy(),
+        "Date": pd.to_datetime(frame["Date"]).to_numpy(),
+        "value": frame["DTWL"].to_numpy(dtype=float),
+    })
+    return readings.sort_values(["key", "Date"], kind="stable").reset_index(drop=True)
+
+
+def breaches(values, thresholds):
+    """True where a level is below its threshold; the breach test for alerts and scenarios alike."""
+    return np.asarray(values, dtype=float) < np.asarray(thresholds, dtype=float)
+
+
+def _aggregate(readings, thresholds):
+    """Per-village minimum, first breach date and set of breaching months."""
+    below = breaches(readings["value"].to_numpy(), readings["key"].map(thresholds).to_numpy())
+    breach = readings[below]
+    result = pd.DataFrame({"min": readings.groupby("key", sort=False)["value"].min()})
+    result["first_breach"] = breach.groupby("key", sort=False)["Date"].min()
+    periods = _periods(breach["Date"]).groupby(breach["key"].to_numpy(), sort=False).agg(set)
+    result["periods"] = [periods.get(k, set()) for k in result.index]
+    return result
+
+
+def _merge(old, new):
+    """Combine two _aggregate results; villages in both get the union of their aggregates."""
+    both = old.index.intersection(new.index)
+    merged = pd.concat([old.drop(index=both), new.drop(index=both)])
+    if len(both):
+        a, b = old.loc[both], new.loc[both]
+        merged = pd.concat([merged, pd.DataFrame({
+            "min": np.fmin(a["min"], b["min"]),
+            "first_breach": pd.concat([a["first_breach"], b["first_breach"]], axis=1).min(axis=1),
+            "periods": [x | y for x, y in zip(a["periods"], b["periods"])],
+        }, index=both)])
+    return merged
+
+
+class AlertScanner:
+    """Ranked critical-level alerts over history and forecast, updatable in place."""
+
+    def __init__(self, threshold=CRITICAL_THRESHOLD, village_thresholds=None, district_thresholds=None,
+                 forecast_start=FORECAST_START, forecast_end=FORECAST_END):
+        self.threshold = threshold
+        self.village_thresholds = {k.strip().lower(): v for k, v in (village_thresholds or {}).items()}
+        self.district_thresholds = {k.strip().lower(): v for k, v in (district_thresholds or {}).items()}
+        self.forecast_start = forecast_start
+        self.forecast_end = forecast_end
+        self._lock = threading.Lock()
+        self.villages = pd.DataFrame()
+        self.history = pd.DataFrame()
+        self.forecast = pd.DataFrame()
+
+    def thresholds(self, names, districts):
+        """Threshold per village name: its own, else its district's, else the default."""
+        own = pd.Series([str(v).strip().lower() for v in names]).map(self.village_thresholds)
+        district = pd.Series([str(d).strip().lower() for d in districts]).map(self.district_thresholds)
+        return own.fillna(district).fillna(self.threshold).astype(float).to_numpy()
+
+    def _thresholds(self, villages):
+        return pd.Series(self.thresholds(villages.index, villages["DISTRICT"]), index=villages.index)
+
+    def _forecast(self, villages):
+        """Forecast aggregates for villages with two readings, from their last two readings."""
+        villages = villages[villages["previous_depth"].notna()]
+        forecast = predict_from_lags(
+            villages["VILLAGE"], villages["latest_depth"], villages["previous_depth"],
+            self.forecast_start, self.forecast_end,
+        )
+        forecast = pd.DataFrame({
+            "key": forecast["VILLAGE"].str.lower(),
+            "Date": pd.to_datetime(forecast["Date"]),
+            "value": forecast["Predicted_DTWl"].astype(float),
+        })
+        return _aggregate(forecast, villages["threshold"])
+
+    @staticmethod
+    def _latest(readings):
+        """Per-village display name, district and last two readings."""
+        grouped = readings.groupby("key", sort=False)
+        previous = readings.groupby("key", sort=False)[["Date", "value"]].shift(1)
+        last = grouped.tail(1).index
+        return pd.DataFrame({
+            "VILLAGE": readings.loc[last, "VILLAGE"].to_numpy(),
+            "DISTRICT": readings.loc[last, "DISTRICT"].to_numpy(),
+            "latest_date": readings.loc[last, "Date"].to_numpy(),
+            "latest_depth": readings.loc[last, "value"].to_numpy(),
+            "previous_date": previous.loc[last, "Date"].to_numpy(),
+            "previous_depth": previous.loc[last, "value"].to_numpy(),
+        }, index=readings.loc[last, "key"].to_numpy())
+
+    def scan(self, df):
+        """Build alerts for every village from readings with VILLAGE, DISTRICT, Date and DTWL."""
+        readings = _readings(df)
+        villages = self._latest(readings)
+        villages["threshold"] = self._thresholds(villages)
+
+        history = _aggregate(readings, villages["threshold"])
+        forecast = self._forecast(villages)
+
+        with self._lock:
+            self.villages, self.history, self.forecast = villages, history, forecast
+        return self.alerts()
+
+    def update(self, new_rows):
+        """Fold new readings in, recomputing only the villages that received them."""
+        new = _readings(new_rows)
+        if new.empty:
+            return self.alerts()
+
+        with self._lock:
+            villages, history, forecast = self.villages, self.history, self.forecast
+
+        # The last two known readings of each touched village plus the new ones
+        touched = new["key"].unique()
+        known = villages.reindex(villages.index.intersection(touched))
+        tails = pd.concat([
+            pd.DataFrame({"key": known.index, "VILLAGE": known["VILLAGE"], "DISTRICT": known["DISTRICT"],
+                          "Date": known[col + "_date"], "value": known[col + "_depth"]})
+            for col in ("previous", "latest")
+        ])
+        tails = tails[tails["Date"].notna()]
+        latest = self._latest(pd.concat([tails, new]).sort_values(["key", "Date"], kind="stable"))
+        latest["threshold"] = self._thresholds(latest)
+
+        villages = pd.concat([villages.drop(index=latest.index, errors="ignore"), latest])
+        history = _merge(history, _aggregate(new, latest["threshold"]))
+        # Their forecasts start from the new last readings, so recompute just those
+        forecast = pd.concat([forecast.drop(index=latest.index, errors="ignore"), self._forecast(latest)])
+
+        with self._lock:
+            self.villages, self.history, self.forecast = villages, history, forecast
+        return self.alerts()
+
+    def alerts(self, include_safe=False):
+        """Ranked alert table: currently critical first, then by earliest breach and minimum depth."""
+        with self._lock:
+            villages, history, forecast = self.villages, self.history, self.forecast
+        if villages.empty:
+            return pd.DataFrame(columns=ALERT_COLUMNS)
+
+        h = history.reindex(villages.index)
+        f = forecast.reindex(villages.index)
+        empty = set()
+        table = pd.DataFrame({
+            "VILLAGE": villages["VILLAGE"].to_numpy(),
+            "DISTRICT": villages["DISTRICT"].to_numpy(),
+            "threshold": villages["threshold"].to_numpy(),
+            "first_breach": pd.concat([h["first_breach"], f["first_breach"]], axis=1).min(axis=1).to_numpy(),
+            "min_depth": np.fmin(h["min"].to_numpy(dtype=float), f["min"].to_numpy(dtype=float)),
+            "months_below": [
+                len((hp if isinstance(hp, set) else empty) | (fp if isinstance(fp, set) else empty))
+                for hp, fp in zip(h["periods"], f["periods"])
+            ],
+            "latest_date": villages["latest_date"].to_numpy(),
+            "latest_depth": villages["latest_depth"].to_numpy(dtype=float),
+        })
+        table["critical_now"] = breaches(table["latest_depth"], table["threshold"])
+        if not include_safe:
+            table = table[table["critical_now"] | (table["months_below"] > 0)]
+        table = table.sort_values(
+            ["critical_now", "first_breach", "min_depth"], ascending=[False, True, True], na_position="last")
+        return table.reset_index(drop=True)
+
+
+_scanner = None
+_scanner_lock = threading.Lock()
+
+
+def get_scanner():
+    """Process-wide scanner over the shared dataset with the default thresholds, kept up to date with live readings."""
+    global _scanner
+    if _scanner is None:
+        with _scanner_lock:
+            if _scanner is None:
+                dataset = load_dataset()
+                scanner = AlertScanner()
+                version = dataset.version
+                scanner.scan(dataset.df)
+                # Live readings only re-forecast their own villages
+                dataset.subscribe(scanner.update)
+                if dataset.version != version:
+                    scanner.scan(dataset.df)
+                _scanner = scanner
+    return _scanner
+
+
+def read_thresholds(path):
+    """Per-village and per-district thresholds from a CSV with columns level, name, threshold."""
+    table = pd.read_csv(path)
+    level = table["level"].str.strip().str.lower()
+    village = table[level == "village"]
+    district = table[level == "district"]
+    return (dict(zip(village["name"], village["threshold"].astype(float))),
+            dict(zip(district["name"], district["threshold"].astype(float))))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scan every village for critical groundwater levels")
+    parser.add_argument("--threshold", type=float, default=CRITICAL_THRESHOLD, help="default threshold (m)")
+    parser.add_argument("--thresholds", help="CSV of per-village/district thresholds (level,name,threshold)")
+    parser.add_argument("--start", default=FORECAST_START, help="first forecast month")
+    parser.add_argument("--end", default=FORECAST_END, help="last forecast month")
+    parser.add_argument("--top", type=int, default=50, help="rows to print")
+    parser.add_argument("--out", help="write the full alert table to this CSV")
+    args = parser.parse_args()
+
+    village_thresholds, district_thresholds = read_thresholds(args.thresholds) if args.thresholds else ({}, {})
+    scanner = AlertScanner(args.threshold, village_thresholds, district_thresholds, args.start, args.end)
+    table = scanner.scan(load_dataset().df)
+
+    print(table.head(args.top).to_string(index=False))
+    print(f"⚠️ {int(table['critical_now'].sum())} villages critical now, {len(table)} with any breach")
+    if args.out:
+        table.to_csv(args.out, index=False)
+        print(f"✅ Saved as {args.out}")
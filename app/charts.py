@@ -0,0 +1,95 @@
+"""
+Chart rendering for the dashboards.
+
+Charts are drawn on standalone matplotlib Figures with the non-interactive
+Agg backend, so no pyplot state is kept and every figure is released as soon
+as it has been rendered to PNG. The PNG bytes are cached, keyed by village,
+role, time range and the data/model version, so a rerun that shows the same
+chart serves the cached image instead of redrawing it.
+
+show_chart() also offers a native Streamlit line chart for fast interactive
+views, which skips matplotlib entirely. matplotlib itself is imported on the
+first render, so importing this module is cheap.
+"""
+import io
+import threading
+from collections import OrderedDict
+
+from instrumentation import count, stage
+
+# Rendered PNGs kept across reruns and sessions (roughly 30-60 KB each)
+MAX_CACHED_CHARTS = 512
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def load_matplotlib():
+    """Import matplotlib with the Agg backend and return the Figure class."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+    return Figure
+
+
+def _to_png(fig):
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", bbox_inches="tight")
+    fig.clf()
+    return buf.getvalue()
+
+
+def render_level_chart(data, value_col, label):
+    """Depth-to-water-level line chart as PNG bytes."""
+    fig = load_matplotlib()(figsize=(10, 4))
+    ax = fig.subplots()
+    ax.plot(data["Date"], data[value_col], marker="o", color="#1f77b4", label=label)
+    ax.set_facecolor("#ffffff")
+    ax.grid(True, linestyle="--", alpha=0.6)
+    ax.set_xlabel("Date", color="#000000")
+    ax.set_ylabel("Depth to Water Level (m)", color="#000000")
+    ax.legend()
+    ax.tick_params(axis="x", labelrotation=45, labelcolor="#000000")
+    ax.tick_params(axis="y", labelcolor="#000000")
+    return _to_png(fig)
+
+
+def render_recharge_chart(recharge_data):
+    """Estimated recharge line chart as PNG bytes."""
+    fig = load_matplotlib()(figsize=(10, 4))
+    ax = fig.subplots()
+    ax.plot(recharge_data["Date"], recharge_data["Recharge"], marker="o", color="#2ca02c", label="Recharge (m)")
+    ax.axhline(0, color="#888888", linestyle="--", linewidth=1)
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Recharge (m)")
+    ax.legend()
+    ax.grid(True, linestyle="--", alpha=0.6)
+    ax.tick_params(axis="x", labelrotation=45)
+    return _to_png(fig)
+
+
+def cached_chart(key, render):
+    """PNG for key, calling render() only if it is not cached yet."""
+    with _lock:
+        png = _cache.get(key)
+        if png is not None:
+            _cache.move_to_end(key)
+            count("chart_cache_hits")
+            return png
+
+    with stage("render_chart"):
+        png = render()
+    with _lock:
+        _cache[key] = png
+        while len(_cache) > MAX_CACHED_CHARTS:
+            _cache.popitem(last=False)
+    return png
+
+
+def show_chart(st, key, render, data, x, y, native=False):
+    """Show a chart in Streamlit: cached matplotlib PNG, or a native line chart if native."""
+    if native:
+        st.line_chart(data, x=x, y=y)
+    else:
+        st.image(cached_chart(key, render))
@@ -1,31 +1,55 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import datetime
 import time
-from predict_future import get_predictions  # Make sure this file exists
+from data_access import load_dataset
+from charts import render_level_chart, render_recharge_chart, show_chart
+from exports import show_bulk_export, show_download
+from forecast_store import get_forecast, store_version  # Make sure this file exists
+from instrumentation import count, enabled, finish_run, show_debug_panel, stage, start_run
+from live import start_follower
+from panels import show_role_panels
+from warmup import mark_first_page, progress, ready, start_warmup
 
 # -------------------------
 # Page Config
 # -------------------------
 st.set_page_config(page_title="AquaTrack", layout="wide")
+start_run(page="dashboard", dashboard=st.session_state.get("dashboard_type"))
 
 # -------------------------
 # Splash Screen (No Image)
 # -------------------------
-splash_placeholder = st.empty()
-with splash_placeholder.container():
-    st.markdown("### AquaTrack\n**Monitor the Groundwater Levels**")
-    st.markdown("*â€œWater is life, preserve it for the future.â€*")
-    time.sleep(3)
-splash_placeholder.empty()
+# Shown once per session, only until the background warm-up has loaded what
+# the first page needs; each check is a short rerun instead of a fixed sleep
+SPLASH_MAX_SECONDS = 10
+
+start_warmup()
+start_follower()
+if 'session_started' not in st.session_state:
+    st.session_state['session_started'] = time.perf_counter()
+
+if 'splash_displayed' not in st.session_state:
+    with stage("splash"):
+        warm = ready(timeout=0.25)
+    if not warm and time.perf_counter() - st.session_state['session_started'] < SPLASH_MAX_SECONDS:
+        st.markdown("### AquaTrack\n**Monitor the Groundwater Levels**")
+        st.markdown("*â€œWater is life, preserve it for the future.â€*")
+        done, total, step = progress()
+        st.progress(min(done / total, 1.0), text=f"Loading {step}..." if step else "Loading...")
+        st.rerun()
+    st.session_state['splash_displayed'] = True
+
+if 'first_page_s' not in st.session_state:
+    st.session_state['first_page_s'] = time.perf_counter() - st.session_state['session_started']
+    mark_first_page()
+    count("first_page_ms", 1000 * st.session_state['first_page_s'])
 
 # -------------------------
 # Load Dataset
 # -------------------------
-df = pd.read_csv("/Users/sruthiuma/Documents/PrototypeSIH/dataset/monsoon_cleaned.csv")
-df["VILLAGE"] = df["VILLAGE"].str.strip()
-df["Date"] = pd.to_datetime(df["Date"])
+with stage("dataset_load"):
+    dataset = load_dataset()
 
 # -------------------------
 # Top Title
@@ -38,7 +62,7 @@ st.markdown("Monitor water levels in your village in real-time")
 # -------------------------
 selected_village = st.selectbox(
     "Select Location",
-    options=sorted(df["VILLAGE"].unique()),
+    options=dataset.villages,
     index=0,
     help="Select your village"
 )
@@ -84,7 +108,8 @@ with col3:
 if 'dashboard_type' in st.session_state:
     dashboard_type = st.session_state['dashboard_type']
 
-    village_data = df[df["VILLAGE"].str.lower() == selected_village.lower()]
+    with stage("village_filter"):
+        village_data = dataset.village(selected_village)
     if village_data.empty:
         st.warning("No data found for this village.")
     else:
@@ -94,6 +119,17 @@ if 'dashboard_type' in st.session_state:
         # -------------------------
         # Time Ranges
         # -------------------------
+        # Cached charts are keyed by the model/dataset version and the village's live readings;
+        # the native charts skip matplotlib
+        data_version = (store_version(), dataset.village_version(selected_village))
+        native_charts = st.sidebar.checkbox("Fast interactive charts", value=False)
+
+        show_role_panels(st, dashboard_type, selected_village, village_data, data_version)
+
+        if dashboard_type != "Farmers":
+            with st.expander("Bulk export (history and forecasts)"):
+                show_bulk_export(st, str(village_data["DISTRICT"].iloc[-1]))
+
         time_ranges = []
 
         if dashboard_type == "Farmers":
@@ -124,25 +160,21 @@ if 'dashboard_type' in st.session_state:
             start, end, label = tr["start"], tr["end"], tr["label"]
 
             if "Predicted" in label or "Future" in label:
-                data = get_predictions(selected_village, start, end)
+                with stage("forecast"):
+                    data = get_forecast(selected_village, start, end)
                 value_col = "Predicted_DTWl"
             else:
-                data = village_data[(village_data["Date"] >= start) & (village_data["Date"] <= end)]
+                with stage("history_filter"):
+                    data = dataset.village_range(selected_village, start, end)
                 value_col = "DTWL"
 
             st.subheader(f"{label} Groundwater Levels")
             if not data.empty:
                 # Groundwater Levels Plot
-                fig, ax = plt.subplots(figsize=(10, 4))
-                ax.plot(data["Date"], data[value_col], marker="o", color="#1f77b4", label=label)
-                ax.set_facecolor("#ffffff")
-                ax.grid(True, linestyle="--", alpha=0.6)
-                ax.set_xlabel("Date", color="#000000")
-                ax.set_ylabel("Depth to Water Level (m)", color="#000000")
-                ax.legend()
-                plt.xticks(rotation=45, color="#000000")
-                plt.yticks(color="#000000")
-                st.pyplot(fig)
+                chart_key = (selected_village, dashboard_type, label, start, end, data_version)
+                with stage("level_chart"):
+                    show_chart(st, chart_key + ("level",), lambda: render_level_chart(data, value_col, label),
+                               data, "Date", value_col, native_charts)
 
                 # Summary
                 st.markdown(
@@ -153,34 +185,32 @@ if 'dashboard_type' in st.session_state:
                 )
 
                 # Recharge Estimation
-                recharge_data = data.sort_values("Date").copy()
-                recharge_data["Recharge"] = recharge_data[value_col].shift(1) - recharge_data[value_col]
-                if (end - start).days > 90:
-                    recharge_data = recharge_data.set_index("Date")[["Recharge"]].resample("M").sum().reset_index()
+                with stage("recharge"):
+                    recharge_data = data.sort_values("Date").copy()
+                    recharge_data["Recharge"] = recharge_data[value_col].shift(1) - recharge_data[value_col]
+                    if (end - start).days > 90:
+                        recharge_data = recharge_data.set_index("Date")[["Recharge"]].resample("M").sum().reset_index()
 
                 st.subheader(f"Estimated Recharge ({label})")
                 if not recharge_data.empty:
-                    fig_r, ax_r = plt.subplots(figsize=(10, 4))
-                    ax_r.plot(recharge_data["Date"], recharge_data["Recharge"], marker="o", color="#2ca02c", label="Recharge (m)")
-                    ax_r.axhline(0, color="#888888", linestyle="--", linewidth=1)
-                    ax_r.set_xlabel("Date")
-                    ax_r.set_ylabel("Recharge (m)")
-                    ax_r.legend()
-                    ax_r.grid(True, linestyle="--", alpha=0.6)
-                    plt.xticks(rotation=45)
-                    st.pyplot(fig_r)
+                    with stage("recharge_chart"):
+                        show_chart(st, chart_key + ("recharge",), lambda: render_recharge_chart(recharge_data),
+                                   recharge_data, "Date", "Recharge", native_charts)
                     st.info(f"Average Recharge ({label}): {recharge_data['Recharge'].mean():.2f} m")
                 else:
                     st.warning(f"No recharge data available for {label}.")
 
                 # Download CSV
                 if dashboard_type != "Farmers":
-                    csv = data.to_csv(index=False)
-                    st.download_button(
-                        label=f"Download {label} Data",
-                        data=csv,
-                        file_name=f"{selected_village}_{label.replace(' ', '_')}.csv",
-                        mime="text/csv"
-                    )
+                    # Serialized only when asked for, then cached for this query
+                    show_download(st, chart_key + ("csv",), data, label,
+                                  f"{selected_village}_{label.replace(' ', '_')}.csv")
             else:
-                st.warning(f"No data available for {label}.")
\ No newline at end of file
+                st.warning(f"No data available for {label}.")
+
+# -------------------------
+# Stage Timings (set AQUATRACK_TIMING=1 to record them)
+# -------------------------
+timings = finish_run()
+if enabled() and st.sidebar.checkbox("Show timing breakdown", value=False):
+    show_debug_panel(st, timings)
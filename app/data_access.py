@@ -0,0 +1,247 @@
+"""
+Shared, read-only access to the cleaned monsoon dataset.
+
+The dataset is loaded once per process and reused by every Streamlit session
+and by predict_future. Rows are sorted by village and date, so each village
+occupies one contiguous block and a lookup is a slice of the shared frame
+rather than a scan over the whole table.
+
+When clean.py has written a columnar copy of the dataset (a Parquet store
+partitioned by district, see clean.py --parquet) that is newer than the CSV,
+it is read instead of the CSV. read_columnar() reads a projection of that
+store for given villages and dates without loading the rest.
+
+Live readings (see live.py) are appended to a separate log next to the CSV.
+load_dataset() applies the log on load and catch_up() applies whatever was
+appended since, in place: only the affected villages' series are replaced,
+and the full frame is re-sorted lazily the next time .df is read. Callbacks
+registered with subscribe() get every batch of applied rows, so caches can
+update just those villages.
+
+Callers must treat the returned frames as read-only.
+"""
+import io
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+dataset_path = "/Users/sruthiuma/Documents/PrototypeSIH/dataset/monsoon_cleaned.csv"
+columnar_path = "/Users/sruthiuma/Documents/PrototypeSIH/dataset/monsoon_cleaned.parquet"
+live_path = "/Users/sruthiuma/Documents/PrototypeSIH/dataset/monsoon_live.csv"
+COLUMNAR_MARKER = "_COMPLETE"
+
+CSV_COLUMNS = ["STATE_UT", "DISTRICT", "BLOCK", "VILLAGE", "LATITUDE", "LONGITUDE", "Date", "DTWL"]
+
+_lock = threading.Lock()
+_datasets = {}
+
+
+def _sort_rows(df):
+    # Same-named villages in different districts can share a date; order
+    # those by district so the CSV and columnar sources sort identically
+    keys = df["VILLAGE"].str.lower()
+    order = np.lexsort((df["DISTRICT"].to_numpy(), df["Date"].to_numpy(), keys.to_numpy()))
+    return df.iloc[order].reset_index(drop=True), keys.iloc[order].to_numpy()
+
+
+def _normalize(df):
+    df = df.copy()
+    for col in ["STATE_UT", "DISTRICT", "BLOCK", "VILLAGE"]:
+        df[col] = df[col].astype(object).fillna("").astype(str).str.strip()
+    df["Date"] = pd.to_datetime(df["Date"])
+    return df
+
+
+class VillageDataset:
+    """The cleaned dataset plus a village -> (start, stop) row index."""
+
+    def __init__(self, df):
+        # _lock guards the state; _notify_lock keeps listeners seeing batches
+        # in log order without holding _lock while they run
+        self._lock = threading.RLock()
+        self._notify_lock = threading.RLock()
+        self._listeners = []
+        self._pending = []
+        self.live_seq = {}
+        self.live_rows = 0
+        self.live_offset = 0
+        self.version = 0
+        self._build(df)
+
+    def _build(self, df):
+        df, keys = _sort_rows(_normalize(df))
+
+        df["VILLAGE"] = df["VILLAGE"].astype("category")
+        for col in ["STATE_UT", "DISTRICT", "BLOCK"]:
+            df[col] = df[col].astype("category")
+
+        bounds = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+        starts = np.concatenate(([0], bounds))
+        stops = np.concatenate((bounds, [len(df)]))
+
+        index = {keys[a]: (a, b) for a, b in zip(starts, stops)} if len(df) else {}
+        self.villages = sorted(df["VILLAGE"].unique())
+        self.districts = sorted(df["DISTRICT"].unique())
+        # (frame, row index, live-updated villages), replaced as a whole so
+        # readers never see one part from before a swap and one from after
+        self._state = (df, index, {})
+
+    @property
+    def df(self):
+        """The whole dataset, sorted by village and date (live rows merged in on first read)."""
+        if self._pending:
+            with self._lock:
+                if self._pending:
+                    self._build(pd.concat([self._state[0]] + self._pending, ignore_index=True))
+                    self._pending = []
+        return self._state[0]
+
+    def village(self, name):
+        """All rows for a village, oldest first (empty frame if unknown)."""
+        key = name.strip().lower()
+        df, index, updated = self._state
+        rows = updated.get(key)
+        if rows is not None:
+            return rows
+        start, stop = index.get(key, (0, 0))
+        return df.iloc[start:stop]
+
+    def village_version(self, name):
+        """Live-log position of the village's latest live reading (-1 if it has none)."""
+        return self.live_seq.get(name.strip().lower(), -1)
+
+    def village_range(self, name, start_date, end_date):
+        """Rows for a village with start_date <= Date <= end_date."""
+        rows = self.village(name)
+        dates = rows["Date"].to_numpy()
+        lo = np.searchsorted(dates, np.datetime64(pd.Timestamp(start_date)), side="left")
+        hi = np.searchsorted(dates, np.datetime64(pd.Timestamp(end_date)), side="right")
+        return rows.iloc[lo:hi]
+
+    def subscribe(self, callback):
+        """Call callback(rows) with every batch of live rows applied from now on."""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def append(self, rows):
+        """Apply live-log rows (in log order) in place; returns the lowercase keys of touched villages."""
+        rows = _normalize(rows[CSV_COLUMNS])
+        if rows.empty:
+            return []
+        with self._notify_lock:
+            with self._lock:
+                df, index, updated = self._state
+                updated = dict(updated)
+                keys = rows["VILLAGE"].str.lower().to_numpy()
+                touched = list(dict.fromkeys(keys))
+                for key in touched:
+                    mine = rows[keys == key]
+                    if key not in index and key not in updated:
+                        self.villages = sorted(self.villages + [mine["VILLAGE"].iloc[0]])
+                    updated[key], _ = _sort_rows(pd.concat([self.village(key), mine], ignore_index=True))
+                    self.live_seq[key] = self.live_rows + int(np.flatnonzero(keys == key)[-1])
+                self.districts = sorted(set(self.districts).union(rows["DISTRICT"]))
+                self._state = (df, index, updated)
+                self._pending.append(rows)
+                self.live_rows += len(rows)
+                self.version += 1
+                listeners = list(self._listeners)
+
+            for callback in listeners:
+                try:
+                    callback(rows)
+                except Exception as exc:
+                    print(f"Live update: {getattr(callback, '__qualname__', callback)} failed: {exc}")
+        return touched
+
+    def catch_up(self, path=live_path):
+        """Apply the rows appended to the live log since the last call; returns how many."""
+        if not os.path.exists(path):
+            return 0
+        with self._notify_lock:
+            with self._lock:
+                with open(path, "rb") as f:
+                    f.seek(self.live_offset)
+                    data = f.read()
+                end = data.rfind(b"\n") + 1
+                if end == 0:
+                    return 0
+                if self.live_offset == 0:
+                    rows = pd.read_csv(io.BytesIO(data[:end]))
+                else:
+                    rows = pd.read_csv(io.BytesIO(data[:end]), header=None, names=CSV_COLUMNS)
+                self.live_offset += end
+            self.append(rows)
+        return len(rows)
+
+
+def columnar_is_fresh(path=columnar_path, csv_path=dataset_path):
+    """True if the columnar store is complete and at least as new as the CSV."""
+    marker = os.path.join(path, COLUMNAR_MARKER)
+    if not os.path.exists(marker):
+        return False
+    return not os.path.exists(csv_path) or os.path.getmtime(marker) >= os.path.getmtime(csv_path)
+
+
+def read_columnar(path=columnar_path, columns=None, villages=None, districts=None,
+                  start_date=None, end_date=None):
+    """Read a projection of the district-partitioned Parquet store.
+
+    Only the requested columns are read, and the village/district/date
+    filters are pushed down to partition pruning and row-group statistics.
+    Numeric columns come back as stored (float32).
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    source = ds.dataset(
+        path, format="parquet",
+        partitioning=ds.HivePartitioning.discover(infer_dictionary=True),
+        exclude_invalid_files=True,
+    )
+    conditions = []
+    if districts is not None:
+        conditions.append(ds.field("DISTRICT").isin(list(districts)))
+    if villages is not None:
+        conditions.append(ds.field("VILLAGE").isin([v.strip() for v in villages]))
+    if start_date is not None:
+        conditions.append(ds.field("Date") >= pa.scalar(pd.Timestamp(start_date), pa.timestamp("ns")))
+    if end_date is not None:
+        conditions.append(ds.field("Date") <= pa.scalar(pd.Timestamp(end_date), pa.timestamp("ns")))
+
+    expr = None
+    for c in conditions:
+        expr = c if expr is None else expr & c
+
+    if columns is None:
+        columns = CSV_COLUMNS
+    df = source.to_table(columns=list(columns), filter=expr).to_pandas()
+    return df[list(columns)]
+
+
+def _widen(df):
+    # float32 on disk; round back to the precision the readings are recorded at
+    df = df.copy()
+    df["DTWL"] = df["DTWL"].astype(np.float64).round(4)
+    for col in ["LATITUDE", "LONGITUDE"]:
+        df[col] = df[col].astype(np.float64).round(5)
+    return df
+
+
+def load_dataset(path=dataset_path):
+    """Return the process-wide VillageDataset for path, loading it on first use."""
+    dataset = _datasets.get(path)
+    if dataset is None:
+        with _lock:
+            dataset = _datasets.get(path)
+            if dataset is None:
+                if path == dataset_path and columnar_is_fresh():
+                    dataset = VillageDataset(_widen(read_columnar()))
+                else:
+                    dataset = VillageDataset(pd.read_csv(path))
+                if path == dataset_path:
+                    dataset.catch_up()
+                _datasets[path] = dataset
+    return dataset
@@ -0,0 +1,293 @@
+"""
+Data exports for the dashboards.
+
+Single-range downloads are built only when asked for: show_download()
+renders a "Prepare download" button and serializes the data on click, and
+the CSV bytes are cached by query (village, range, data and live version) so the
+download stays available on later reruns without serializing again.
+
+Bulk exports take a list of villages, a district or a block and write their
+history and forecasts as a zip of CSV or Parquet files. They run in a
+background worker; start_export() returns a job id and job_status() reports
+its progress. A finished export is reused for the same query and data
+version. Forecasts are per village name, so villages that share a name
+across districts share a forecast; query.json in the archive lists them.
+
+    python exports.py --district Guntur --format parquet
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from data_access import load_dataset
+
+exports_dir = "/Users/sruthiuma/Documents/PrototypeSIH/exports"
+
+FORMATS = ("csv", "parquet")
+
+# Serialized single-range downloads kept across reruns and sessions
+MAX_CACHED_DOWNLOADS = 256
+
+# Villages forecast per batch in a bulk export (progress is reported per batch)
+EXPORT_BATCH_VILLAGES = 100
+
+# Bumped when the archive contents change, so earlier exports are not reused
+EXPORT_LAYOUT = 2
+
+# Seconds between status checks on the page while an export runs
+EXPORT_POLL_SECONDS = 1.0
+
+# Finished jobs are forgotten once downloaded, after JOB_TTL_SECONDS, or
+# oldest first beyond MAX_JOBS
+JOB_TTL_SECONDS = 3600
+MAX_JOBS = 100
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="aquatrack-export")
+
+
+def cached_csv(key, data):
+    """CSV bytes of data, serialized once per key."""
+    with _cache_lock:
+        csv = _cache.get(key)
+        if csv is not None:
+            _cache.move_to_end(key)
+            return csv
+
+    csv = data.to_csv(index=False).encode()
+    with _cache_lock:
+        _cache[key] = csv
+        while len(_cache) > MAX_CACHED_DOWNLOADS:
+            _cache.popitem(last=False)
+    return csv
+
+
+def show_download(st, key, data, label, file_name):
+    """Download button whose CSV is only built after a click on "Prepare"."""
+    with _cache_lock:
+        ready = key in _cache
+    if not ready and not st.button(f"Prepare {label} download", key=f"prepare_{hash(key)}"):
+        return
+    st.download_button(label=f"Download {label} Data", data=cached_csv(key, data),
+                       file_name=file_name, mime="text/csv")
+
+
+def _matching(df, villages=None, district=None, block=None):
+    """Mask of the rows of df in the given villages, district and block (all given filters apply)."""
+    mask = pd.Series(True, index=df.index)
+    if district:
+        mask &= df["DISTRICT"].astype(str).str.lower() == district.strip().lower()
+    if block:
+        mask &= df["BLOCK"].astype(str).str.lower() == block.strip().lower()
+    if villages:
+        mask &= df["VILLAGE"].astype(str).str.lower().isin([v.strip().lower() for v in villages])
+    return mask
+
+
+def select_villages(villages=None, district=None, block=None):
+    """Village names matching the given list, district and block (all given filters apply)."""
+    df = load_dataset().df
+    return sorted(df.loc[_matching(df, villages, district, block), "VILLAGE"].astype(str).unique())
+
+
+def _query_key(query):
+    # The same query on the same data and model gives the same file
+    from forecast_store import store_version
+
+    payload = json.dumps(dict(query, version=store_version(), live_rows=load_dataset().live_rows, layout=EXPORT_LAYOUT),
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def _write_table(archive, name, frame, fmt):
+    if fmt == "csv":
+        archive.writestr(f"{name}.csv", frame.to_csv(index=False))
+    else:
+        buf = io.BytesIO()
+        frame.to_parquet(buf, index=False)
+        archive.writestr(f"{name}.parquet", buf.getvalue())
+
+
+def _run_export(job_id, query, path):
+    from predict_future import get_predictions_batch
+
+    job = _jobs[job_id]
+    try:
+        job.update(status="running", message="Selecting villages")
+        names = select_villages(query["villages"], query["district"], query["block"])
+        if not names:
+            raise ValueError("No villages match the export query")
+
+        dataset = load_dataset()
+        start, end = pd.Timestamp(query["start"]), pd.Timestamp(query["end"])
+        history = pd.concat([dataset.village_range(v, start, end) for v in names], ignore_index=True)
+        # About 50 village names exist in several districts; keep only the queried district and block
+        history = history[_matching(history, None, query["district"], query["block"])].reset_index(drop=True)
+        for col in ["STATE_UT", "DISTRICT", "BLOCK", "VILLAGE"]:
+            history[col] = history[col].astype(str)
+
+        forecasts = []
+        for i in range(0, len(names), EXPORT_BATCH_VILLAGES):
+            batch = names[i:i + EXPORT_BATCH_VILLAGES]
+            job.update(progress=i / len(names),
+                       message=f"Forecasting villages {i + 1}-{i + len(batch)} of {len(names)}")
+            forecasts.append(get_predictions_batch(batch, query["forecast_start"], query["forecast_end"]))
+        forecasts = pd.concat(forecasts, ignore_index=True)
+        # The model knows villages by name, so same-named villages share one forecast
+        shared = [v for v in names if dataset.village(v)["DISTRICT"].nunique() > 1]
+
+        job.update(progress=1.0, message="Writing archive")
+        tmp_path = path + ".tmp"
+        with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            _write_table(archive, "history", history, query["format"])
+            _write_table(archive, "forecasts", forecasts, query["format"])
+            notes = dict(query, villages=names, shared_forecasts=shared)
+            if shared:
+                notes["note"] = ("Forecasts are per village name. The villages in shared_forecasts have "
+                                 "namesakes in other districts; their forecast is made from the readings "
+                                 "of all of them.")
+            archive.writestr("query.json", json.dumps(notes, indent=2, default=str))
+        os.replace(tmp_path, path)
+        job.update(status="done", message=f"Exported {len(names)} villages", path=path, villages=len(names))
+    except Exception as exc:
+        job.update(status="failed", message=str(exc))
+    finally:
+        job["finished"] = time.time()
+
+
+def start_export(villages=None, district=None, block=None, start="2014-01-01", end="2024-12-31",
+                 forecast_start="2025-01-01", forecast_end="2026-12-31", fmt="csv", directory=None):
+    """Queue a bulk export and return its job id (finished immediately if already exported)."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    query = {
+        "villages": sorted(villages) if villages else None,
+        "district": district, "block": block,
+        "start": str(start), "end": str(end),
+        "forecast_start": str(forecast_start), "forecast_end": str(forecast_end),
+        "format": fmt,
+    }
+    directory = directory or exports_dir
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"export_{_query_key(query)}.zip")
+
+    job_id = uuid.uuid4().hex[:12]
+    job = {"id": job_id, "query": query, "status": "queued", "progress": 0.0, "message": "Queued",
+           "path": None, "started": time.time(), "finished": None}
+    with _jobs_lock:
+        _prune_jobs()
+        _jobs[job_id] = job
+    if os.path.exists(path):
+        job.update(status="done", progress=1.0, message="Reused an earlier export", path=path,
+                   finished=time.time())
+    else:
+        _executor.submit(_run_export, job_id, query, path)
+    return job_id
+
+
+def _prune_jobs():
+    # Caller holds _jobs_lock; jobs still queued or running are kept
+    now = time.time()
+    finished = sorted((job["finished"], job_id) for job_id, job in _jobs.items() if job["finished"] is not None)
+    for i, (when, job_id) in enumerate(finished):
+        if now - when > JOB_TTL_SECONDS or len(finished) - i > MAX_JOBS:
+            del _jobs[job_id]
+
+
+def forget_job(job_id):
+    """Drop a job's state, e.g. once its archive has been downloaded."""
+    with _jobs_lock:
+        _jobs.pop(job_id, None)
+
+
+def job_status(job_id):
+    """Copy of the job's state: status (queued/running/done/failed), progress 0-1, message, path."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    return dict(job) if job else None
+
+
+def show_bulk_export(st, district=None):
+    """Bulk export form plus the progress and download of this session's latest export."""
+    dataset = load_dataset()
+    districts = dataset.districts
+    with st.form("bulk_export"):
+        chosen = st.selectbox("District", [""] + districts,
+                              index=districts.index(district) + 1 if district in districts else 0)
+        block = st.text_input("Block (optional)")
+        villages = st.multiselect("Villages (optional)", dataset.villages)
+        fmt = st.radio("Format", FORMATS, horizontal=True)
+        if st.form_submit_button("Start export"):
+            if not (chosen or block or villages):
+                st.warning("Choose a district, block or villages to export.")
+            else:
+                st.session_state["export_job"] = start_export(villages or None, chosen or None, block or None,
+                                                              fmt=fmt)
+
+    job_id = st.session_state.get("export_job")
+    job = job_status(job_id)
+    if job is None:
+        return
+    running = job["status"] in ("queued", "running")
+
+    def downloaded():
+        forget_job(job_id)
+        st.session_state.pop("export_job", None)
+
+    # Only the status reruns while the export runs, not the whole page
+    @st.fragment(run_every=EXPORT_POLL_SECONDS if running else None)
+    def status():
+        job = job_status(job_id)
+        if job is None:
+            return
+        if running and job["status"] not in ("queued", "running"):
+            # A full rerun stops the polling
+            st.rerun()
+        st.progress(job["progress"], text=job["message"])
+        if job["status"] == "done":
+            with open(job["path"], "rb") as f:
+                st.download_button("Download export", data=f.read(), file_name=os.path.basename(job["path"]),
+                                   mime="application/zip", on_click=downloaded)
+        elif job["status"] == "failed":
+            st.error(f"Export failed: {job['message']}")
+
+    status()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export history and forecasts for many villages")
+    parser.add_argument("--villages", nargs="+", help="village names")
+    parser.add_argument("--district", help="all villages of this district")
+    parser.add_argument("--block", help="all villages of this block")
+    parser.add_argument("--start", default="2014-01-01", help="first history date")
+    parser.add_argument("--end", default="2024-12-31", help="last history date")
+    parser.add_argument("--forecast-start", default="2025-01-01", help="first forecast month")
+    parser.add_argument("--forecast-end", default="2026-12-31", help="last forecast month")
+    parser.add_argument("--format", choices=FORMATS, default="csv", help="files inside the zip")
+    parser.add_argument("--out", default=exports_dir, help="directory for the archive")
+    args = parser.parse_args()
+
+    job_id = start_export(args.villages, args.district, args.block, args.start, args.end,
+                          args.forecast_start, args.forecast_end, args.format, args.out)
+    while True:
+        status = job_status(job_id)
+        print(f"{status['progress']:.0%} {status['message']}")
+        if status["status"] in ("done", "failed"):
+            break
+        time.sleep(0.5)
+    if status["status"] == "done":
+        print(f"✅ Saved as {status['path']}")
@@ -0,0 +1,147 @@
+"""
+Precomputed forecast store.
+
+Run as a script to materialize forecasts for every village:
+
+    python forecast_store.py --start 2025-01-01 --months 120
+
+Forecasts are written to forecasts/forecasts_<version>.npz, where the version
+is a hash of the model file plus the dataset. The dashboards call
+get_forecast(), which serves from the store and falls back to a live
+get_predictions() call when the store is stale or does not cover the range.
+
+Forecasts are recursive from the last two observations, so a forecast that
+starts in a different month is a different path. Lookups therefore only hit
+when the requested range starts at the store's origin month.
+
+The store records how many live readings (live.py) the dataset had when it
+was written; a village that has received live readings since is forecast
+again instead, while every other village is still served from the store.
+"""
+import argparse
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+import predict_future
+from data_access import load_dataset
+from predict_future import get_predictions, get_predictions_batch
+
+store_dir = "/Users/sruthiuma/Documents/PrototypeSIH/forecasts"
+
+_version_cache = {}
+_loaded = {}
+
+
+def _file_digest(path):
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if key not in _version_cache:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        _version_cache[key] = h.hexdigest()
+    return _version_cache[key]
+
+
+def store_version(model_path=None, dataset_path=None):
+    """Hash of the model file and dataset the forecasts were computed from."""
+    model_path = model_path or predict_future.model_path
+    dataset_path = dataset_path or predict_future.dataset_path
+    h = hashlib.sha256()
+    h.update(_file_digest(model_path).encode())
+    h.update(_file_digest(dataset_path).encode())
+    return h.hexdigest()[:16]
+
+
+def store_path(version, directory=None):
+    return os.path.join(directory or store_dir, f"forecasts_{version}.npz")
+
+
+def materialize(start_date, months, directory=None):
+    """Forecast every village for `months` months from start_date and write the store."""
+    start = pd.Timestamp(start_date).normalize()
+    end = start + pd.offsets.MonthEnd(months)
+    dataset = load_dataset()
+    villages = dataset.villages
+
+    forecasts = get_predictions_batch(villages, start, end)
+    table = forecasts.pivot(index="Date", columns="VILLAGE", values="Predicted_DTWl")
+
+    version = store_version()
+    path = store_path(version, directory)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp.npz"
+    np.savez_compressed(
+        tmp_path,
+        version=np.array(version),
+        origin=np.array(start.to_period("M").to_timestamp(), dtype="datetime64[ns]"),
+        dates=table.index.to_numpy(dtype="datetime64[ns]"),
+        villages=np.array([v.lower() for v in table.columns]),
+        predictions=table.to_numpy(dtype=np.float32),
+        live_rows=np.array(dataset.live_rows),
+    )
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_store(directory=None):
+    """Return the store for the current model and dataset, or None if it is stale or missing."""
+    path = store_path(store_version(), directory)
+    if path not in _loaded:
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            villages = data["villages"]
+            _loaded[path] = {
+                "origin": pd.Timestamp(data["origin"][()]),
+                "dates": pd.DatetimeIndex(data["dates"]),
+                "predictions": data["predictions"],
+                "columns": {v: i for i, v in enumerate(villages)},
+                "live_rows": int(data["live_rows"]) if "live_rows" in data else 0,
+            }
+    return _loaded[path]
+
+
+def lookup(village, start_date, end_date, directory=None):
+    """Serve a forecast from the store, or return None if it cannot answer the range."""
+    store = load_store(directory)
+    if store is None:
+        return None
+    start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    col = store["columns"].get(village.strip().lower())
+    if col is None or start.to_period("M").to_timestamp() != store["origin"]:
+        return None
+    if end > store["dates"][-1]:
+        return None
+    # Live readings newer than the store change this village's forecast
+    if load_dataset().village_version(village) >= store["live_rows"]:
+        return None
+
+    mask = (store["dates"] >= start) & (store["dates"] <= end)
+    return pd.DataFrame({
+        "Date": store["dates"][mask],
+        "Predicted_DTWl": store["predictions"][mask, col].astype(float),
+    })
+
+
+def get_forecast(village, start_date, end_date):
+    """Forecast for the dashboards: store lookup first, live prediction otherwise."""
+    forecast = lookup(village, start_date, end_date)
+    if forecast is None:
+        forecast = get_predictions(village, start_date, end_date)
+    return forecast
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Materialize forecasts for every village")
+    parser.add_argument("--start", default="2025-01-01", help="first forecast month")
+    parser.add_argument("--months", type=int, default=120, help="forecast horizon in months")
+    parser.add_argument("--out", default=store_dir, help="directory for the forecast store")
+    args = parser.parse_args()
+
+    path = materialize(args.start, args.months, args.out)
+    print(f"✅ Saved forecasts to {path}")
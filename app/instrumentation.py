@@ -0,0 +1,168 @@
+"""
+Per-rerun stage timing.
+
+Each dashboard rerun is one run: start_run() opens a record for the current
+thread, stage("name") blocks add their wall time to it, count("name", n)
+adds to a counter, and finish_run() closes the record and appends it as one
+JSON line to a rotating log:
+
+    start_run(page="main", village=selected_village)
+    with stage("dataset_load"):
+        dataset = load_dataset()
+    count("model_calls")
+    record = finish_run()
+
+Nested stages are recorded as "outer/inner". Timing is off unless the
+AQUATRACK_TIMING environment variable is set (or enable() is called); while
+off, stage() hands back one shared no-op context manager and count() returns
+at once, so the calls can stay in hot paths.
+"""
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+
+log_path = "/Users/sruthiuma/Documents/PrototypeSIH/logs/timings.jsonl"
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 5
+
+_enabled = bool(os.environ.get("AQUATRACK_TIMING"))
+_local = threading.local()
+_logger = None
+_logger_lock = threading.Lock()
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+class _Stage:
+    __slots__ = ("record", "name", "start")
+
+    def __init__(self, record, name):
+        self.record = record
+        self.name = name
+
+    def __enter__(self):
+        path = self.record["_path"]
+        path.append(self.name)
+        self.name = "/".join(path)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = 1000 * (time.perf_counter() - self.start)
+        self.record["_path"].pop()
+        stages = self.record["stages"]
+        stages[self.name] = stages.get(self.name, 0.0) + elapsed
+        calls = self.record["calls"]
+        calls[self.name] = calls.get(self.name, 0) + 1
+        return False
+
+
+def enable(on=True):
+    global _enabled
+    _enabled = on
+
+
+def enabled():
+    return _enabled
+
+
+def start_run(**meta):
+    """Open a timing record for this thread's rerun; meta is stored with it."""
+    if not _enabled:
+        return
+    _local.record = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "meta": meta,
+        "stages": {},
+        "calls": {},
+        "counts": {},
+        "_path": [],
+        "_start": time.perf_counter(),
+    }
+
+
+def stage(name):
+    """Context manager adding the block's wall time (ms) to the current record's stage."""
+    record = getattr(_local, "record", None) if _enabled else None
+    if record is None:
+        return _NO_STAGE
+    return _Stage(record, name)
+
+
+def timed(name):
+    """Decorator form of stage()."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name, n=1):
+    """Add n to a counter of the current record (model calls, rows processed, ...)."""
+    if not _enabled:
+        return
+    record = getattr(_local, "record", None)
+    if record is not None:
+        record["counts"][name] = record["counts"].get(name, 0) + n
+
+
+def _get_logger():
+    global _logger
+    if _logger is None:
+        with _logger_lock:
+            if _logger is None:
+                os.makedirs(os.path.dirname(log_path), exist_ok=True)
+                handler = logging.handlers.RotatingFileHandler(
+                    log_path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS
+                )
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger = logging.getLogger("aquatrack.timings")
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                logger.addHandler(handler)
+                _logger = logger
+    return _logger
+
+
+def finish_run():
+    """Close this thread's record, log it as a JSON line and return it (None when off)."""
+    record = getattr(_local, "record", None)
+    if record is None:
+        return None
+    _local.record = None
+    record["total_ms"] = 1000 * (time.perf_counter() - record.pop("_start"))
+    record.pop("_path")
+    _get_logger().info(json.dumps(record, default=str))
+    return record
+
+
+def show_debug_panel(st, record):
+    """Collapsible breakdown of a finished record."""
+    if record is None:
+        return
+    with st.expander(f"Timing breakdown ({record['total_ms']:.0f} ms)"):
+        stages = sorted(record["stages"].items(), key=lambda s: s[1], reverse=True)
+        st.table([
+            {"stage": name, "ms": round(ms, 2), "calls": record["calls"][name]}
+            for name, ms in stages
+        ])
+        if record["counts"]:
+            st.json(record["counts"])
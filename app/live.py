@@ -0,0 +1,241 @@
+"""
+Live reading ingestion.
+
+Readings arrive as (village, date, DTWL), optionally with the district to
+tell same-named villages apart. Valid readings are appended to the live log
+(data_access.live_path), an append-only CSV in the dataset's schema; the
+location columns are copied from the village's latest reading. Rejected
+readings go to <live log>.quarantine.csv with a reason, as clean.py does for
+the raw export.
+
+Every app process runs start_follower(), which applies newly appended log
+rows to its in-memory dataset in place (VillageDataset.catch_up). Only the
+affected villages' series change, and the caches subscribed to the dataset
+(alerts, aggregate cube) update just those villages; forecasts in the
+forecast store and cached charts/downloads are keyed by each village's
+live-log position, so only those villages are recomputed.
+
+Readings can be fed in three ways:
+
+    python live.py --file readings.csv        # one CSV or JSON file
+    python live.py --watch /path/to/dropdir   # poll a drop directory
+    python live.py --http 8502                # POST JSON to /readings
+
+CSV files need village, date and dtwl columns (district optional); JSON is
+a list of objects with the same keys.
+"""
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from data_access import CSV_COLUMNS, live_path, load_dataset
+
+# Plausible depth to water level range (m); anything outside is quarantined
+MIN_DTWL = -10.0
+MAX_DTWL = 200.0
+
+FOLLOW_INTERVAL = 5.0  # seconds between live-log checks in app processes
+WATCH_INTERVAL = 2.0  # seconds between drop-directory scans
+
+_write_lock = threading.Lock()
+_follower = None
+_follower_lock = threading.Lock()
+
+
+def _records_frame(records):
+    frame = pd.DataFrame(records)
+    frame.columns = [str(c).strip().lower() for c in frame.columns]
+    for col in ["village", "date", "dtwl", "district"]:
+        if col not in frame:
+            frame[col] = None
+    # Missing fields become None so rejected records serialize as valid JSON
+    return frame.astype(object).where(frame.notna(), None)
+
+
+def validate(records, dataset):
+    """Split readings into (accepted rows in the dataset's schema, rejected (record, reason) pairs)."""
+    frame = _records_frame(records)
+    accepted, rejected = [], []
+    seen = set()
+    today = pd.Timestamp.today().normalize()
+
+    for record in frame.to_dict("records"):
+        village = str(record["village"] or "").strip()
+        district = str(record["district"] or "").strip()
+        date = pd.to_datetime(record["date"], errors="coerce")
+        dtwl = pd.to_numeric(record["dtwl"], errors="coerce")
+
+        history = dataset.village(village) if village else None
+        if history is not None and district:
+            history = history[history["DISTRICT"].astype(str).str.lower() == district.lower()]
+        if not village:
+            reason = "missing village"
+        elif history is None or history.empty:
+            reason = "unknown village" if not district else "unknown village in district"
+        elif not district and history["DISTRICT"].astype(str).nunique() > 1:
+            reason = "village name is in several districts; give the district"
+        elif pd.isna(date):
+            reason = "invalid date"
+        elif date > today + pd.Timedelta(days=1):
+            reason = "date in the future"
+        elif pd.isna(dtwl) or not np.isfinite(dtwl) or not MIN_DTWL <= dtwl <= MAX_DTWL:
+            reason = "DTWL missing or out of range"
+        else:
+            latest = history.iloc[-1]
+            key = (village.lower(), str(latest["DISTRICT"]).lower(), date)
+            if key in seen or (history["Date"] == date).any():
+                reason = "duplicate reading"
+            else:
+                reason = None
+                seen.add(key)
+                row = {col: latest[col] for col in CSV_COLUMNS}
+                row.update(Date=date, DTWL=float(dtwl))
+                accepted.append(row)
+        if reason is not None:
+            rejected.append((record, reason))
+
+    rows = pd.DataFrame(accepted, columns=CSV_COLUMNS)
+    for col in ["STATE_UT", "DISTRICT", "BLOCK", "VILLAGE"]:
+        rows[col] = rows[col].astype(str)
+    return rows, rejected
+
+
+def ingest(records, path=live_path):
+    """Validate readings, append the valid ones to the live log and apply them here; returns a summary."""
+    dataset = load_dataset()
+    with _write_lock:
+        dataset.catch_up(path)
+        rows, rejected = validate(records, dataset)
+        if len(rows):
+            header = not os.path.exists(path) or os.path.getsize(path) == 0
+            rows.to_csv(path, mode="a", header=header, index=False, date_format="%Y-%m-%d")
+        if rejected:
+            quarantine_path = path + ".quarantine.csv"
+            q = pd.DataFrame({
+                "received": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "reason": [reason for _, reason in rejected],
+                "record": [json.dumps(record, default=str) for record, _ in rejected],
+            })
+            q.to_csv(quarantine_path, mode="a", header=not os.path.exists(quarantine_path), index=False)
+        dataset.catch_up(path)
+    return {
+        "accepted": len(rows),
+        "rejected": [{"record": record, "reason": reason} for record, reason in rejected],
+    }
+
+
+def read_file(path):
+    """Readings from a drop file (.json list of objects, otherwise CSV)."""
+    if path.lower().endswith(".json"):
+        with open(path) as f:
+            records = json.load(f)
+        return records if isinstance(records, list) else [records]
+    return pd.read_csv(path).to_dict("records")
+
+
+def watch(directory, interval=WATCH_INTERVAL):
+    """Ingest every file dropped into directory, then move it to directory/processed."""
+    processed = os.path.join(directory, "processed")
+    os.makedirs(processed, exist_ok=True)
+    while True:
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            # Writers should drop files with a .tmp suffix and rename them when complete
+            if not os.path.isfile(path) or name.startswith(".") or name.endswith(".tmp"):
+                continue
+            try:
+                summary = ingest(read_file(path))
+                print(f"{name}: {summary['accepted']} accepted, {len(summary['rejected'])} rejected")
+            except Exception as exc:
+                print(f"{name}: failed: {exc}")
+            shutil.move(path, os.path.join(processed, name))
+        time.sleep(interval)
+
+
+class ReadingsHandler(BaseHTTPRequestHandler):
+    """POST /readings with a JSON object or list; GET /health."""
+
+    def _reply(self, status, body):
+        payload = json.dumps(body, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == "/health":
+            dataset = load_dataset()
+            self._reply(200, {"status": "ok", "live_rows": dataset.live_rows})
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/readings":
+            self._reply(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            records = json.loads(self.rfile.read(length) or b"[]")
+        except ValueError as exc:
+            self._reply(400, {"error": f"invalid JSON: {exc}"})
+            return
+        summary = ingest(records if isinstance(records, list) else [records])
+        self._reply(200 if not summary["rejected"] else 207, summary)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host="127.0.0.1"):
+    server = ThreadingHTTPServer((host, port), ReadingsHandler)
+    print(f"Accepting readings on http://{host}:{port}/readings")
+    server.serve_forever()
+
+
+def start_follower(interval=FOLLOW_INTERVAL):
+    """Apply new live-log rows to this process's dataset every interval seconds (once per process)."""
+    global _follower
+    if _follower is not None:
+        return
+    with _follower_lock:
+        if _follower is not None:
+            return
+
+        def follow():
+            while True:
+                time.sleep(interval)
+                try:
+                    load_dataset().catch_up()
+                except Exception as exc:
+                    print(f"Live update failed: {exc}")
+
+        _follower = threading.Thread(target=follow, name="aquatrack-live", daemon=True)
+        _follower.start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest live groundwater readings")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--file", help="ingest one CSV or JSON file")
+    group.add_argument("--watch", metavar="DIR", help="ingest files dropped into this directory")
+    group.add_argument("--http", metavar="PORT", type=int, help="accept POST /readings on this port")
+    parser.add_argument("--host", default="127.0.0.1", help="address for --http")
+    args = parser.parse_args()
+
+    if args.file:
+        summary = ingest(read_file(args.file))
+        print(f"✅ {summary['accepted']} readings accepted")
+        for r in summary["rejected"]:
+            print(f"⚠️ Rejected ({r['reason']}): {r['record']}")
+    elif args.watch:
+        watch(args.watch)
+    else:
+        serve(args.http, args.host)
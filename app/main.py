@@ -1,12 +1,21 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import datetime
 import time
-from predict_future import get_predictions
+from data_access import load_dataset
+from charts import render_level_chart, render_recharge_chart, show_chart
+from exports import show_bulk_export, show_download
+from forecast_store import get_forecast, store_version
+from alerts import CRITICAL_THRESHOLD
+from panels import show_role_panels
+from instrumentation import count, enabled, finish_run, show_debug_panel, stage, start_run
+from live import start_follower
+from warmup import mark_first_page, progress, ready, start_warmup
 
 
 st.set_page_config(page_title="AquaTrack", layout="wide")
+start_run(page="main", dashboard=st.session_state.get("dashboard_type"),
+          village=st.session_state.get("selected_village"))
 
 # CSS for professional button styles
 st.markdown(
@@ -32,45 +41,60 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-CRITICAL_THRESHOLD = 3.0  # meters for alerts
+SPLASH_MAX_SECONDS = 10  # show the page anyway if warm-up takes longer
 
-# Splash screen + quote
+# Load the dataset, model and chart caches in the background for every session
+start_warmup()
+start_follower()
+if "session_started" not in st.session_state:
+    st.session_state.session_started = time.perf_counter()
+
+# Splash screen + quote until the warm-up has loaded what the first page needs;
+# each check is a short rerun, so the session never sits in a fixed sleep
 if "splash_displayed" not in st.session_state:
-    splash_placeholder = st.empty()
-    combined_html = """
-    <div style="
-        background: linear-gradient(45deg, #00b4db, #0083b0);
-        height: 300px;
-        border-radius: 15px;
-        margin: 30px;
-        display: flex;
-        flex-direction: column;
-        justify-content: center;
-        align-items: center;
-        color: white;
-        text-align: center;
-        padding: 20px;
-    ">
-        <div style="font-size: 3em; font-weight: bold; margin-bottom: 10px;">
-            AquaTrack
-        </div>
+    with stage("splash"):
+        warm = ready(timeout=0.25)
+    if not warm and time.perf_counter() - st.session_state.session_started < SPLASH_MAX_SECONDS:
+        combined_html = """
         <div style="
-            font-style: italic; 
-            color: #aad4f5;
-            font-size: 1.2em;
-            max-width: 600px;
+            background: linear-gradient(45deg, #00b4db, #0083b0);
+            height: 300px;
+            border-radius: 15px;
+            margin: 30px;
+            display: flex;
+            flex-direction: column;
+            justify-content: center;
+            align-items: center;
+            color: white;
+            text-align: center;
+            padding: 20px;
         ">
-            "Water is life – Preserve it for future generations."
+            <div style="font-size: 3em; font-weight: bold; margin-bottom: 10px;">
+                AquaTrack
+            </div>
+            <div style="
+                font-style: italic; 
+                color: #aad4f5;
+                font-size: 1.2em;
+                max-width: 600px;
+            ">
+                "Water is life – Preserve it for future generations."
+            </div>
         </div>
-    </div>
-    """
-    splash_placeholder.markdown(combined_html, unsafe_allow_html=True)
-    time.sleep(2)
-    splash_placeholder.empty()
+        """
+        st.markdown(combined_html, unsafe_allow_html=True)
+        done, total, step = progress()
+        st.progress(min(done / total, 1.0), text=f"Loading {step}..." if step else "Loading...")
+        st.rerun()
     st.session_state.splash_displayed = True
-df = pd.read_csv("/Users/sruthiuma/Documents/PrototypeSIH/dataset/monsoon_cleaned.csv")
-df["VILLAGE"] = df["VILLAGE"].str.strip()
-df["Date"] = pd.to_datetime(df["Date"])
+
+if "first_page_s" not in st.session_state:
+    st.session_state.first_page_s = time.perf_counter() - st.session_state.session_started
+    mark_first_page()
+    count("first_page_ms", 1000 * st.session_state.first_page_s)
+
+with stage("dataset_load"):
+    dataset = load_dataset()
 
 if "dashboard_type" not in st.session_state:
     st.session_state.dashboard_type = None
@@ -79,7 +103,7 @@ if st.session_state.dashboard_type is None:
     st.title("AquaTrack - Groundwater Resource Evaluation")
     st.markdown("Monitor water levels in your village in real-time")
 
-    villages = sorted(df["VILLAGE"].unique())
+    villages = dataset.villages
     villages_with_placeholder = ["select village"] +villages
 
     selected_village = st.selectbox(
@@ -134,7 +158,8 @@ if st.session_state.dashboard_type is None:
 else:
     dashboard_type = st.session_state.dashboard_type
     selected_village = st.session_state.selected_village
-    village_data = df[df["VILLAGE"].str.lower() == selected_village.lower()]
+    with stage("village_filter"):
+        village_data = dataset.village(selected_village)
 
     if village_data.empty:
         st.warning("No data found for this village.")
@@ -143,6 +168,17 @@ else:
         st.success(f"Showing {dashboard_type} data for: {selected_village}")
         st.subheader(f"{dashboard_type} Dashboard - {selected_village}")
 
+        # Cached charts are keyed by the model/dataset version and the village's live readings;
+        # the native charts skip matplotlib
+        data_version = (store_version(), dataset.village_version(selected_village))
+        native_charts = st.sidebar.checkbox("Fast interactive charts", value=False)
+
+        show_role_panels(st, dashboard_type, selected_village, village_data, data_version)
+
+        if dashboard_type != "Farmers":
+            with st.expander("Bulk export (history and forecasts)"):
+                show_bulk_export(st, str(village_data["DISTRICT"].iloc[-1]))
+
         time_ranges = []
         if dashboard_type == "Farmers":
             time_ranges = [
@@ -163,10 +199,12 @@ else:
         for tr in time_ranges:
             start, end, label = tr["start"], tr["end"], tr["label"]
             if "Predicted" in label or "Future" in label:
-                data = get_predictions(selected_village, start, end)
+                with stage("forecast"):
+                    data = get_forecast(selected_village, start, end)
                 value_col = "Predicted_DTWl"
             else:
-                data = village_data[(village_data["Date"] >= start) & (village_data["Date"] <= end)]
+                with stage("history_filter"):
+                    data = dataset.village_range(selected_village, start, end)
                 value_col = "DTWL"
 
             st.subheader(f"{label} Groundwater Levels")
@@ -177,16 +215,10 @@ else:
                 else:
                     st.success(f"✅ Groundwater level within safe limits. Minimum depth {min_val:.2f}m.")
 
-                fig, ax = plt.subplots(figsize=(10, 4))
-                ax.plot(data["Date"], data[value_col], marker="o", color="#1f77b4", label=label)
-                ax.set_facecolor("#ffffff")
-                ax.grid(True, linestyle="--", alpha=0.6)
-                ax.set_xlabel("Date", color="#000000")
-                ax.set_ylabel("Depth to Water Level (m)", color="#000000")
-                ax.legend()
-                plt.xticks(rotation=45, color="#000000")
-                plt.yticks(color="#000000")
-                st.pyplot(fig)
+                chart_key = (selected_village, dashboard_type, label, start, end, data_version)
+                with stage("level_chart"):
+                    show_chart(st, chart_key + ("level",), lambda: render_level_chart(data, value_col, label),
+                               data, "Date", value_col, native_charts)
 
                 st.markdown(
                     f"**Summary ({label}):**\n"
@@ -195,33 +227,24 @@ else:
                     f"- Maximum Depth to Water Level: {data[value_col].max():.2f} m"
                 )
 
-                recharge_data = data.sort_values("Date").copy()
-                recharge_data["Recharge"] = recharge_data[value_col].shift(1) - recharge_data[value_col]
-                if (end - start).days > 90:
-                    recharge_data = recharge_data.set_index("Date")[["Recharge"]].resample("M").sum().reset_index()
+                with stage("recharge"):
+                    recharge_data = data.sort_values("Date").copy()
+                    recharge_data["Recharge"] = recharge_data[value_col].shift(1) - recharge_data[value_col]
+                    if (end - start).days > 90:
+                        recharge_data = recharge_data.set_index("Date")[["Recharge"]].resample("M").sum().reset_index()
                 st.subheader(f"Estimated Recharge ({label})")
                 if not recharge_data.empty:
-                    fig_r, ax_r = plt.subplots(figsize=(10, 4))
-                    ax_r.plot(recharge_data["Date"], recharge_data["Recharge"], marker="o", color="#2ca02c", label="Recharge (m)")
-                    ax_r.axhline(0, color="#888888", linestyle="--", linewidth=1)
-                    ax_r.set_xlabel("Date")
-                    ax_r.set_ylabel("Recharge (m)")
-                    ax_r.legend()
-                    ax_r.grid(True, linestyle="--", alpha=0.6)
-                    plt.xticks(rotation=45)
-                    st.pyplot(fig_r)
+                    with stage("recharge_chart"):
+                        show_chart(st, chart_key + ("recharge",), lambda: render_recharge_chart(recharge_data),
+                                   recharge_data, "Date", "Recharge", native_charts)
                     st.info(f"Average Recharge ({label}): {recharge_data['Recharge'].mean():.2f} m")
                 else:
                     st.warning(f"No recharge data available for {label}.")
 
                 if dashboard_type != "Farmers":
-                    csv = data.to_csv(index=False)
-                    st.download_button(
-                        label=f"Download {label} Data",
-                        data=csv,
-                        file_name=f"{selected_village}_{label.replace(' ', '_')}.csv",
-                        mime="text/csv",
-                    )
+                    # Serialized only when asked for, then cached for this query
+                    show_download(st, chart_key + ("csv",), data, label,
+                                  f"{selected_village}_{label.replace(' ', '_')}.csv")
             else:
                 st.warning(f"No data available for {label}.")
 
@@ -230,3 +253,8 @@ else:
     if st.button("Back to Role Selection"):
       st.session_state['page'] = 'role_selection'
       st.session_state['dashboard_type'] = None
+
+# Stage timings for this rerun (set AQUATRACK_TIMING=1 to record them)
+timings = finish_run()
+if enabled() and st.sidebar.checkbox("Show timing breakdown", value=False):
+    show_debug_panel(st, timings)
@@ -0,0 +1,193 @@
+"""
+Lazy, memory-bounded access to the per-village models in models/.
+
+models/ holds one <Village>_best_model.pkl per village, some of which are
+stubs (a pickled None) or otherwise unusable. The registry indexes the
+directory once, reporting bad files up front, and resolves a village to its
+own model when a valid one exists and to the global best_model.pkl otherwise.
+
+Village models are loaded on first use, from their compiled form (see
+tree_compiler) when an up-to-date one exists and otherwise from the pickle,
+memory-mapped where joblib allows. They are kept in an LRU cache whose total
+size is bounded by memory_budget bytes. The global model is loaded once and
+never evicted.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import joblib
+
+from tree_compiler import compiled_path, load_compiled
+
+models_dir = "/Users/sruthiuma/Documents/PrototypeSIH/models"
+global_model_path = os.path.join(models_dir, "best_model.pkl")
+# Direct multi-horizon model (see train_models.py --direct)
+direct_model_path = os.path.join(models_dir, "direct_model.pkl")
+
+MODEL_SUFFIX = "_best_model.pkl"
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024  # bytes
+
+# A pickled None is 4 bytes; anything this small cannot hold a fitted model
+_MIN_MODEL_BYTES = 64
+
+
+def horizons_path(model_path):
+    """JSON list of the horizons (months) a direct model was trained on, saved next to it."""
+    return os.path.splitext(model_path)[0] + ".horizons.json"
+
+
+def _check_model_file(path):
+    """Return None if path looks like a loadable model, otherwise the reason it does not."""
+    size = os.path.getsize(path)
+    if size < _MIN_MODEL_BYTES:
+        return f"stub file ({size} bytes)"
+    with open(path, "rb") as f:
+        head = f.read(2)
+        f.seek(-1, os.SEEK_END)
+        tail = f.read(1)
+    if head[:1] == b"\x80":
+        # Plain pickle: must end with the STOP opcode, otherwise it is truncated
+        return None if tail == b"." else "truncated pickle"
+    if head in (b"ZF", b"\x78\x01", b"\x78\x5e", b"\x78\x9c", b"\x78\xda", b"\x1f\x8b", b"BZ", b"\xfd7"):
+        # joblib compressed formats are only validated when loaded
+        return None
+    return "not a pickle or joblib file"
+
+
+def load_model_file(path):
+    """Load a model, preferring an up-to-date compiled form saved next to the pickle."""
+    compiled = compiled_path(path)
+    if os.path.exists(compiled):
+        model = load_compiled(compiled, source_path=path)
+        if model is not None:
+            return model
+    try:
+        return joblib.load(path, mmap_mode="r")
+    except ValueError:
+        # Compressed files cannot be memory-mapped
+        return joblib.load(path)
+
+
+class ModelRegistry:
+    """Resolve villages to models, loading village models lazily under a memory budget."""
+
+    def __init__(self, directory=models_dir, fallback_path=global_model_path,
+                 memory_budget=DEFAULT_MEMORY_BUDGET):
+        self.directory = directory
+        self.fallback_path = fallback_path
+        self.memory_budget = memory_budget
+        self.paths = {}
+        self.invalid = {}
+        self._global_model = None
+        self._cache = OrderedDict()
+        self._cache_bytes = 0
+        self._lock = threading.RLock()
+        self.build_index()
+
+    def build_index(self):
+        """Scan the models directory, recording valid model files and reporting bad ones."""
+        paths, invalid = {}, {}
+        if os.path.isdir(self.directory):
+            for name in sorted(os.listdir(self.directory)):
+                if not name.endswith(MODEL_SUFFIX):
+                    continue
+                village = name[: -len(MODEL_SUFFIX)]
+                path = os.path.join(self.directory, name)
+                reason = _check_model_file(path)
+                if reason is None:
+                    paths[village.lower()] = path
+                else:
+                    invalid[village] = reason
+
+        with self._lock:
+            self.paths = paths
+            self.invalid = invalid
+            self._cache.clear()
+            self._cache_bytes = 0
+
+        if invalid:
+            print(f"Model registry: {len(invalid)} unusable village models in {self.directory}, "
+                  f"falling back to the global model for them")
+        return paths
+
+    @property
+    def global_model(self):
+        with self._lock:
+            if self._global_model is None:
+                self._global_model = load_model_file(self.fallback_path)
+            return self._global_model
+
+    def resolve(self, village):
+        """Path of the model used for village (the global model if it has none)."""
+        return self.paths.get(village.strip().lower(), self.fallback_path)
+
+    def get(self, village):
+        """Model for village, loading and caching it on first use."""
+        key = village.strip().lower()
+        path = self.paths.get(key)
+        if path is None:
+            return self.global_model
+
+        with self._lock:
+            if path in self._cache:
+                self._cache.move_to_end(path)
+                return self._cache[path][0]
+
+        model = self._load(key, path)
+        if model is None:
+            return self.global_model
+
+        size = os.path.getsize(path)
+        with self._lock:
+            if path not in self._cache:
+                self._cache[path] = (model, size)
+                self._cache_bytes += size
+                self._evict()
+            return self._cache[path][0]
+
+    def _load(self, key, path):
+        try:
+            model = load_model_file(path)
+        except Exception as exc:
+            model, reason = None, f"failed to load: {exc}"
+        else:
+            reason = None if hasattr(model, "predict") else f"not a model ({type(model).__name__})"
+
+        if reason is not None:
+            with self._lock:
+                self.paths.pop(key, None)
+                self.invalid[os.path.basename(path)[: -len(MODEL_SUFFIX)]] = reason
+            print(f"Model registry: {path} {reason}, using the global model instead")
+            return None
+        return model
+
+    def _evict(self):
+        # Always keep the most recently used model, even if it alone exceeds the budget
+        while self._cache_bytes > self.memory_budget and len(self._cache) > 1:
+            _, (_, size) = self._cache.popitem(last=False)
+            self._cache_bytes -= size
+
+    def stats(self):
+        with self._lock:
+            return {
+                "indexed": len(self.paths),
+                "invalid": len(self.invalid),
+                "cached": len(self._cache),
+                "cached_bytes": self._cache_bytes,
+                "memory_budget": self.memory_budget,
+            }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Process-wide registry over the default models directory."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
@@ -0,0 +1,79 @@
+"""
+Role-specific expanders shared by both dashboards (main.py and dashboard.py).
+
+    show_role_panels(st, dashboard_type, selected_village, village_data, data_version)
+
+Policy Makers get the statewide alert table, the district/block rollups and
+the drought scenarios; Farmers get the level near their farm. Each panel is
+timed as its own stage.
+"""
+from aggregates import get_cube
+from alerts import get_scanner
+from instrumentation import stage
+from scenarios import simulate
+from spatial import get_index
+
+
+def show_alerts(st):
+    with st.expander("Statewide critical-level alerts"), stage("alerts"):
+        statewide = get_scanner().alerts()
+        st.caption(f"{int(statewide['critical_now'].sum())} villages below their threshold now, "
+                   f"{len(statewide)} with a breach in their history or forecast")
+        st.dataframe(statewide, use_container_width=True)
+
+
+def show_rollups(st, own_district):
+    with st.expander("District and block rollups"), stage("rollups"):
+        cube = get_cube()
+        districts = cube.children("DISTRICT")
+        st.dataframe(districts, use_container_width=True)
+        names = districts["DISTRICT"].tolist()
+        district = st.selectbox("District", names, index=names.index(own_district) if own_district in names else 0)
+        st.dataframe(cube.children("BLOCK", DISTRICT=district), use_container_width=True)
+        st.line_chart(cube.series("DISTRICT", DISTRICT=district), x="Month", y=["dtwl_mean", "recharge_mean"])
+
+
+def show_scenarios(st, selected_village, village_data, data_version):
+    with st.expander("Drought scenarios"), stage("scenarios"):
+        n_scenarios = st.slider("Scenarios", 100, 5000, 1000, step=100)
+        failure_prob = st.slider("Chance of a failed monsoon per year", 0.0, 1.0, 0.2)
+        failure_offset = st.number_input("Recharge lost in a failed monsoon (m)", value=2.0)
+        params = (selected_village, n_scenarios, failure_prob, failure_offset, data_version)
+        # Same thresholds and breach test as the alert table
+        scanner = get_scanner()
+        threshold = scanner.thresholds([selected_village], [village_data["DISTRICT"].iloc[-1]])[0]
+        if st.button("Run scenarios"):
+            st.session_state["scenarios"] = (params, simulate(
+                [selected_village], n_scenarios=n_scenarios, monsoon_failure_prob=failure_prob,
+                monsoon_failure_offset=failure_offset, threshold=scanner.threshold,
+                village_thresholds=scanner.village_thresholds, district_thresholds=scanner.district_thresholds))
+        ran = st.session_state.get("scenarios")
+        if ran and ran[0] == params:
+            bands = ran[1]
+            st.line_chart(bands, x="Date", y=["q05", "q50", "q95"])
+            worst = bands.loc[bands["p_breach"].idxmax()]
+            st.caption(f"Highest monthly chance of falling below the alert threshold ({threshold:.2f} m): "
+                       f"{worst['p_breach']:.0%} in {worst['Date']:%b %Y}")
+
+
+def show_near_me(st, village_data):
+    with st.expander("Level near my farm"), stage("near_me"):
+        lat = st.number_input("Latitude", value=float(village_data["LATITUDE"].iloc[-1]), format="%.4f")
+        lon = st.number_input("Longitude", value=float(village_data["LONGITUDE"].iloc[-1]), format="%.4f")
+        stations = get_index()
+        st.metric("Estimated depth to water level", f"{stations.interpolate(lat, lon)[0]:.2f} m")
+        nearby = stations.within(lat, lon, radius_km=10)
+        if nearby.empty:
+            nearby = stations.nearest(lat, lon, k=3)
+        st.dataframe(nearby[["VILLAGE", "DISTRICT", "distance_km", "latest_date", "latest_depth"]],
+                     use_container_width=True)
+
+
+def show_role_panels(st, dashboard_type, selected_village, village_data, data_version):
+    """The expanders for dashboard_type, above the village's charts."""
+    if dashboard_type == "Policy Makers":
+        show_alerts(st)
+        show_rollups(st, str(village_data["DISTRICT"].iloc[-1]))
+        show_scenarios(st, selected_village, village_data, data_version)
+    elif dashboard_type == "Farmers":
+        show_near_me(st, village_data)
@@ -1,54 +1,259 @@
 import pandas as pd
-import joblib
+import numpy as np
+import json
 import os
+import threading
+import warnings
+from data_access import dataset_path, load_dataset
+from instrumentation import count, stage
+from model_registry import direct_model_path, get_registry, global_model_path, horizons_path, load_model_file
 
-# Load the trained model
-model_path = "/Users/sruthiuma/Documents/PrototypeSIH/models/best_model.pkl"
-model = joblib.load(model_path)
+# The global model and the dataset are loaded on first use (get_model,
+# get_dataset), so importing this module is cheap; village models are
+# loaded lazily by the registry
+model_path = global_model_path
+model = None
+dataset = None
+df = None
+_layout = None
+_load_lock = threading.Lock()
 
-# Load dataset
-dataset_path = "/Users/sruthiuma/Documents/PrototypeSIH/dataset/monsoon_cleaned.csv"
-df = pd.read_csv(dataset_path)
-df["Date"] = pd.to_datetime(df["Date"])
+# Direct multi-horizon model and the horizons it was trained on, loaded on first use in mode="direct"
+_direct_model = None
+_direct_horizons = None
 
-def get_predictions(village, start_date, end_date):
+# Rows per predict call in direct mode, bounding the dense feature matrix
+DIRECT_BATCH_ROWS = 4096
+
+
+def _feature_layout(m):
+    # Column positions in a model's feature matrix
+    names = list(m.feature_names_in_)
+    index = {name: i for i, name in enumerate(names)}
+    villages = {
+        col.replace("VILLAGE_", "").lower(): i
+        for i, col in enumerate(names)
+        if col.startswith("VILLAGE_")
+    }
+    return names, index, villages
+
+
+def get_model():
+    """The global model, loaded on first use."""
+    global model, _layout
+    if model is None:
+        with _load_lock:
+            if model is None:
+                m = get_registry().global_model
+                _layout = _feature_layout(m)
+                model = m
+    return model
+
+
+def get_dataset():
+    """The shared dataset, loaded on first use."""
+    global dataset, df
+    if dataset is None:
+        with _load_lock:
+            if dataset is None:
+                loaded = load_dataset(dataset_path)
+                df = loaded.df
+                dataset = loaded
+    return dataset
+
+
+def _predict(m, X):
+    # X is built column-for-column from feature_names_in_, so the name check is redundant
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        return m.predict(X)
+
+
+def feature_matrix(m, names, dtype=np.float64):
     """
-    Predict DTWL for the given village between start_date and end_date
+    Zeroed feature matrix for model m with one row per village and its
+    VILLAGE_ column set, plus the column index by feature name. Callers
+    fill in Year, Month, Lag1 and Lag2.
     """
-    print(f"Village selected: {village}")
-    print(f"Start date: {start_date}, End date: {end_date}")
-    print(f"Available villages in dataset: {df['VILLAGE'].unique()}")
+    if m is model:
+        names_, index, villages = _layout
+    else:
+        names_, index, villages = _feature_layout(m)
+
+    X = np.zeros((len(names), len(names_)), dtype=dtype)
+    for row, v in enumerate(names):
+        if v.lower() in villages:
+            X[row, villages[v.lower()]] = 1
+    return X, index
 
-    data = df[df["VILLAGE"].str.strip().str.lower() == village.strip().lower()].sort_values("Date")
-    if len(data) < 2:
-        print(f"No data found for village: {village}")
-        return pd.DataFrame()  # Not enough data
 
-    lag1 = data["DTWL"].iloc[-1]
-    lag2 = data["DTWL"].iloc[-2]
+def _forecast(m, names, lag1, lag2, future_dates):
+    """Recursive forecast for villages that share model m; returns (months, villages)."""
+    X, index = feature_matrix(m, names)
+
+    year_col, month_col = index["Year"], index["Month"]
+    lag1_col, lag2_col = index["Lag1"], index["Lag2"]
+
+    predictions = np.empty((len(future_dates), len(names)))
+    for step, date in enumerate(future_dates):
+        X[:, year_col] = date.year
+        X[:, month_col] = date.month
+        X[:, lag1_col] = lag1
+        X[:, lag2_col] = lag2
+
+        pred = _predict(m, X)
+        predictions[step] = pred
+        count("model_calls")
+        count("rows_predicted", len(names))
+
+        lag2 = lag1
+        lag1 = pred
+    return predictions
+
+
+def get_direct_model():
+    global _direct_model
+    if _direct_model is None:
+        _direct_model = load_model_file(direct_model_path)
+    return _direct_model
+
+
+def get_direct_horizons():
+    """Horizons (months) the direct model was trained on; others would be extrapolation."""
+    global _direct_horizons
+    if _direct_horizons is None:
+        path = horizons_path(direct_model_path)
+        if os.path.exists(path):
+            with open(path) as f:
+                _direct_horizons = np.array(json.load(f), dtype=int)
+        else:
+            # Models trained before the horizons were saved: recompute them from the dataset
+            from train_models import build_horizon_features
+            _direct_horizons = np.unique(build_horizon_features(get_dataset().df)["Horizon"]).astype(int)
+    return _direct_horizons
+
+
+def _forecast_direct(m, names, lag1, lag2, last_dates, future_dates, horizons):
+    """
+    Predict every (month, village) pair independently from the last two
+    observations. Pairs whose horizon is not in horizons are left NaN.
+    """
+    names_, index, villages = _feature_layout(m)
+    n, steps = len(names), len(future_dates)
+
+    years = np.repeat(future_dates.year.to_numpy(), n)
+    months = np.repeat(future_dates.month.to_numpy(), n)
+    horizon = (years - np.tile(last_dates.year.to_numpy(), steps)) * 12 \
+        + (months - np.tile(last_dates.month.to_numpy(), steps))
+    village_col = np.tile([villages.get(v.lower(), -1) for v in names], steps)
+    lag1, lag2 = np.tile(lag1, steps), np.tile(lag2, steps)
+
+    # Only predict the pairs whose horizon the model was trained on
+    seen = np.flatnonzero(np.isin(horizon, horizons))
+    predictions = np.full(n * steps, np.nan)
+    for lo in range(0, len(seen), DIRECT_BATCH_ROWS):
+        pos = seen[lo:lo + DIRECT_BATCH_ROWS]
+        X = np.zeros((len(pos), len(names_)))
+        X[:, index["Year"]] = years[pos]
+        X[:, index["Month"]] = months[pos]
+        X[:, index["Lag1"]] = lag1[pos]
+        X[:, index["Lag2"]] = lag2[pos]
+        X[:, index["Horizon"]] = horizon[pos]
+        rows = np.flatnonzero(village_col[pos] >= 0)
+        X[rows, village_col[pos][rows]] = 1
+        predictions[pos] = _predict(m, X)
+        count("model_calls")
+        count("rows_predicted", len(pos))
+    return predictions.reshape(steps, n)
+
+
+def get_predictions_batch(villages, start_date, end_date, village_models=False, mode="recursive"):
+    """
+    Predict DTWL for several villages between start_date and end_date.
+
+    All villages share one feature matrix (one row per village) and each
+    month is a single model.predict call. Villages with fewer than two
+    observations are skipped. Returns columns VILLAGE, Date, Predicted_DTWl.
+
+    With village_models=True each village uses its own model from models/
+    when a valid one exists, with one batch per distinct model.
+
+    mode="recursive" (the default) feeds each month's prediction back in as
+    the next month's Lag1. mode="direct" uses the direct multi-horizon model
+    (train_models.py --direct) to predict every month independently from the
+    last two observations, in one batch; village_models does not apply there.
+    The direct model is trained on (mostly annual) reading pairs, so it only
+    returns the months whose horizon from each village's last reading it
+    saw in training, typically whole years; the other months are left out.
+    """
+    if mode not in ("recursive", "direct"):
+        raise ValueError(f"Unknown forecast mode: {mode}")
+
+    dataset = get_dataset()
+    names = list(dict.fromkeys(v.strip() for v in villages))
+    names = [v for v in names if len(dataset.village(v)) >= 2]
 
     future_dates = pd.date_range(start=pd.to_datetime(start_date), end=pd.to_datetime(end_date), freq='M')
-    predictions = []
+    if not names or len(future_dates) == 0:
+        return pd.DataFrame(columns=["VILLAGE", "Date", "Predicted_DTWl"])
 
-    all_villages = [col.replace("VILLAGE_", "") for col in model.feature_names_in_ if col.startswith("VILLAGE_")]
+    lags = np.stack([dataset.village(v)["DTWL"].to_numpy()[-2:] for v in names])
+    lag1 = lags[:, 1].astype(float)
+    lag2 = lags[:, 0].astype(float)
 
-    for date in future_dates:
-        X_new = pd.DataFrame({
-            "Year": [date.year],
-            "Month": [date.month],
-            "Lag1": [lag1],
-            "Lag2": [lag2]
-        })
+    if mode == "direct":
+        last_dates = pd.DatetimeIndex([dataset.village(v)["Date"].iloc[-1] for v in names])
+        predictions = _forecast_direct(get_direct_model(), names, lag1, lag2, last_dates, future_dates,
+                                       get_direct_horizons())
+        frame = _as_frame(names, future_dates, predictions)
+        return frame.dropna(subset=["Predicted_DTWl"]).reset_index(drop=True)
+    elif not village_models:
+        predictions = _forecast(get_model(), names, lag1, lag2, future_dates)
+    else:
+        # One batch per distinct model; villages without a usable model share the global one
+        registry = get_registry()
+        groups = {}
+        for row, v in enumerate(names):
+            groups.setdefault(registry.resolve(v), []).append(row)
+        predictions = np.empty((len(future_dates), len(names)))
+        for rows in groups.values():
+            m = registry.get(names[rows[0]])
+            predictions[:, rows] = _forecast(m, [names[r] for r in rows], lag1[rows], lag2[rows], future_dates)
 
-        for v in all_villages:
-            X_new[f"VILLAGE_{v}"] = 1 if v.lower() == village.strip().lower() else 0
+    return _as_frame(names, future_dates, predictions)
 
-        X_new = X_new[model.feature_names_in_]
 
-        pred = model.predict(X_new)[0]
-        predictions.append({"Date": date, "Predicted_DTWl": pred})
+def _as_frame(names, future_dates, predictions):
+    return pd.DataFrame({
+        "VILLAGE": np.tile(names, len(future_dates)),
+        "Date": np.repeat(future_dates, len(names)),
+        "Predicted_DTWl": predictions.ravel(),
+    })
 
-        lag2 = lag1
-        lag1 = pred
 
-    return pd.DataFrame(predictions)
+def predict_from_lags(villages, lag1, lag2, start_date, end_date):
+    """
+    Recursive forecast with the global model from the given last two
+    readings (lag1 the latest) instead of the dataset's. Same output
+    columns as get_predictions_batch.
+    """
+    names = [v.strip() for v in villages]
+    future_dates = pd.date_range(start=pd.to_datetime(start_date), end=pd.to_datetime(end_date), freq='M')
+    if not names or len(future_dates) == 0:
+        return pd.DataFrame(columns=["VILLAGE", "Date", "Predicted_DTWl"])
+    predictions = _forecast(get_model(), names, np.asarray(lag1, dtype=float), np.asarray(lag2, dtype=float),
+                            future_dates)
+    return _as_frame(names, future_dates, predictions)
+
+
+def get_predictions(village, start_date, end_date, village_models=False, mode="recursive"):
+    """
+    Predict DTWL for the given village between start_date and end_date
+    (empty frame if it has fewer than two readings)
+    """
+    with stage("get_predictions"):
+        predictions = get_predictions_batch([village], start_date, end_date, village_models, mode)
+    if predictions.empty:
+        return pd.DataFrame()  # Not enough data
+
+    return predictions[["Date", "Predicted_DTWl"]].reset_index(drop=True)
@@ -0,0 +1,231 @@
+"""
+Monte Carlo drought scenarios.
+
+get_predictions() gives one deterministic path from the last two readings.
+simulate() runs many perturbed paths through the same recursive
+Year/Month/Lag1/Lag2 model and summarizes them per village and month:
+
+    lag shocks        normal noise (lag_shock_sd, m) on the starting readings
+                      and on every simulated month before it is fed back
+    monsoon failure   with probability monsoon_failure_prob per scenario and
+                      year, statewide, the monsoon months of that year lose
+                      monsoon_failure_offset m of recharge in total
+    village deficits  extra drawdown per month (m) for named villages
+
+A breach is what alerts.py counts as one (alerts.breaches): a level below
+the village's threshold, taken per village, then per district, then
+CRITICAL_THRESHOLD as in AlertScanner. Monsoon failures and deficits move
+the level towards that side of the threshold.
+
+Scenarios x villages are stacked into one feature matrix per forecast month,
+so each month is one predict call over up to SCENARIO_BATCH_ROWS rows.
+Villages are split into chunks that run in a joblib process pool
+(workers), and each chunk returns only its summary: the quantile bands, the
+probability per month of a breach and, for a RandomForest model, the mean spread of the per-tree predictions,
+taken from the same tree walk that gives the prediction.
+
+    python scenarios.py --district Guntur --scenarios 10000 --workers -1
+"""
+import argparse
+import time
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from alerts import CRITICAL_THRESHOLD, FORECAST_END, FORECAST_START, AlertScanner, breaches
+from predict_future import feature_matrix, get_dataset, get_model
+from tree_compiler import CompiledModel, compile_model
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+# Months whose readings carry the monsoon recharge (June-November)
+MONSOON_MONTHS = (6, 7, 8, 9, 10, 11)
+
+# Rows per predict call (scenarios x villages); a few thousand rows of the
+# wide one-hot matrix stay in cache, larger batches predict slower per row
+SCENARIO_BATCH_ROWS = 4096
+
+_compiled = {}
+
+
+def _tree_model(m):
+    """The model as a CompiledModel if it is a random forest (for per-tree spread), else None."""
+    if isinstance(m, CompiledModel):
+        return m if m.kind == "RandomForestRegressor" else None
+    if type(m).__name__ != "RandomForestRegressor":
+        return None
+    if id(m) not in _compiled:
+        _compiled[id(m)] = (m, CompiledModel(compile_model(m)))
+    return _compiled[id(m)][1]
+
+
+def _predict(m, trees, X):
+    """(predictions, per-row std of the tree predictions or None), from one pass over the trees."""
+    if trees is None:
+        from sklearn import config_context
+
+        # X is built here and always finite; skip the per-call finiteness scan
+        with warnings.catch_warnings(), config_context(assume_finite=True):
+            warnings.filterwarnings("ignore", message="X does not have valid feature names")
+            return m.predict(X), None
+    # Leaf values are already divided by the number of trees
+    leaves = trees.leaf_values(X)
+    return trees.base + leaves.sum(axis=1), leaves.std(axis=1) * leaves.shape[1]
+
+
+def _quantile_name(q):
+    return f"q{round(q * 100):02d}"
+
+
+def _simulate_chunk(names, seeds, lag1, lag2, deficits, thresholds, shift, dates, lag_shock_sd, quantiles):
+    """Simulate every scenario for a chunk of villages; returns their summary arrays."""
+    m = get_model()
+    trees = _tree_model(m)
+    n_scenarios, steps = shift.shape
+    n_villages = len(names)
+
+    # Noise per village from its own seed, so results do not depend on the chunking
+    noise = np.stack([
+        np.random.default_rng(seed).standard_normal((n_scenarios, steps + 2)) for seed in seeds
+    ], axis=2) * lag_shock_sd
+
+    per_batch = max(1, SCENARIO_BATCH_ROWS // n_villages)
+    base, index = feature_matrix(m, names, dtype=np.float32)
+    X = np.tile(base, (min(per_batch, n_scenarios), 1))
+    year_col, month_col = index["Year"], index["Month"]
+    lag1_col, lag2_col = index["Lag1"], index["Lag2"]
+
+    paths = np.empty((n_scenarios, steps, n_villages))
+    spread = np.zeros((steps, n_villages)) if trees is not None else None
+    for lo in range(0, n_scenarios, per_batch):
+        hi = min(lo + per_batch, n_scenarios)
+        Xb = X[:(hi - lo) * n_villages]
+        l2 = lag2 + noise[lo:hi, 0]
+        l1 = lag1 + noise[lo:hi, 1]
+        for step, date in enumerate(dates):
+            Xb[:, year_col] = date.year
+            Xb[:, month_col] = date.month
+            Xb[:, lag1_col] = l1.ravel()
+            Xb[:, lag2_col] = l2.ravel()
+
+            pred, tree_std = _predict(m, trees, Xb)
+            level = pred.reshape(hi - lo, n_villages) - shift[lo:hi, step, None] - deficits + noise[lo:hi, step + 2]
+            paths[lo:hi, step] = level
+            if spread is not None:
+                spread[step] += tree_std.reshape(hi - lo, n_villages).sum(axis=0)
+
+            l2 = l1
+            l1 = level
+
+    return {
+        "quantiles": np.quantile(paths, quantiles, axis=0),
+        "p_breach": breaches(paths, thresholds).mean(axis=0),
+        "tree_spread": spread / n_scenarios if spread is not None else None,
+    }
+
+
+def monsoon_shift(dates, n_scenarios, failure_prob, offset, rng):
+    """(scenarios, months) recharge lost (m) to statewide monsoon failures drawn per scenario and year."""
+    years = dates.year.to_numpy()
+    first = years.min()
+    failed = rng.random((n_scenarios, years.max() - first + 1)) < failure_prob
+    monsoon = np.isin(dates.month.to_numpy(), MONSOON_MONTHS)
+    # A failed monsoon's lost recharge is spread over its months
+    return failed[:, years - first] * monsoon * (offset / len(MONSOON_MONTHS))
+
+
+def simulate(villages, start_date=FORECAST_START, end_date=FORECAST_END, n_scenarios=1000, lag_shock_sd=0.5,
+             monsoon_failure_prob=0.2, monsoon_failure_offset=2.0, village_deficits=None,
+             threshold=CRITICAL_THRESHOLD, village_thresholds=None, district_thresholds=None, quantiles=QUANTILES,
+             seed=0, workers=1):
+    """
+    Monte Carlo forecast bands for the villages with the global model.
+
+    village_deficits maps village names to extra drawdown per month.
+    threshold, village_thresholds and district_thresholds are the alert
+    thresholds as AlertScanner takes them. Villages with fewer than two
+    readings are skipped. Returns one row per village and month with
+    columns VILLAGE, Date, q05..q95 (one per quantile), p_breach (share of
+    scenarios below the village's threshold in that month) and tree_spread
+    (mean std of the per-tree predictions for a RandomForest model, NaN
+    otherwise).
+    """
+    dataset = get_dataset()
+    names = list(dict.fromkeys(v.strip() for v in villages))
+    names = [v for v in names if len(dataset.village(v)) >= 2]
+    dates = pd.date_range(start=pd.to_datetime(start_date), end=pd.to_datetime(end_date), freq="M")
+    columns = ["VILLAGE", "Date"] + [_quantile_name(q) for q in quantiles] + ["p_breach", "tree_spread"]
+    if not names or len(dates) == 0:
+        return pd.DataFrame(columns=columns)
+
+    lags = np.stack([dataset.village(v)["DTWL"].to_numpy()[-2:] for v in names]).astype(float)
+    deficits = {k.strip().lower(): float(d) for k, d in (village_deficits or {}).items()}
+    deficit = np.array([deficits.get(v.lower(), 0.0) for v in names])
+    scanner = AlertScanner(threshold, village_thresholds, district_thresholds)
+    limit = scanner.thresholds(names, [dataset.village(v)["DISTRICT"].iloc[-1] for v in names])
+
+    rng = np.random.default_rng(seed)
+    shift = monsoon_shift(dates, n_scenarios, monsoon_failure_prob, monsoon_failure_offset, rng)
+    seeds = [[seed, i] for i in range(len(names))]
+
+    chunk = max(1, SCENARIO_BATCH_ROWS // n_scenarios)
+    chunks = [slice(i, i + chunk) for i in range(0, len(names), chunk)]
+    results = joblib.Parallel(n_jobs=workers)(
+        joblib.delayed(_simulate_chunk)(
+            names[c], seeds[c], lags[c, 1], lags[c, 0], deficit[c], limit[c], shift, dates,
+            lag_shock_sd, quantiles,
+        ) for c in chunks
+    )
+
+    bands = np.concatenate([r["quantiles"] for r in results], axis=2)
+    out = {
+        "VILLAGE": np.tile(names, len(dates)),
+        "Date": np.repeat(dates, len(names)),
+    }
+    for q, band in zip(quantiles, bands):
+        out[_quantile_name(q)] = band.ravel()
+    out["p_breach"] = np.concatenate([r["p_breach"] for r in results], axis=1).ravel()
+    if results[0]["tree_spread"] is not None:
+        out["tree_spread"] = np.concatenate([r["tree_spread"] for r in results], axis=1).ravel()
+    else:
+        out["tree_spread"] = np.nan
+    return pd.DataFrame(out, columns=columns)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo drought scenarios per village and month")
+    parser.add_argument("--villages", nargs="+", help="village names")
+    parser.add_argument("--district", help="all villages of this district")
+    parser.add_argument("--block", help="all villages of this block")
+    parser.add_argument("--start", default=FORECAST_START, help="first forecast month")
+    parser.add_argument("--end", default=FORECAST_END, help="last forecast month")
+    parser.add_argument("--scenarios", type=int, default=1000, help="scenarios per village")
+    parser.add_argument("--shock", type=float, default=0.5, help="lag shock standard deviation (m)")
+    parser.add_argument("--failure-prob", type=float, default=0.2, help="chance of a failed monsoon per year")
+    parser.add_argument("--failure-offset", type=float, default=2.0, help="recharge lost in a failed monsoon (m)")
+    parser.add_argument("--deficit", type=float, default=0.0, help="extra drawdown per month for every village (m)")
+    parser.add_argument("--threshold", type=float, default=CRITICAL_THRESHOLD, help="default alert threshold (m)")
+    parser.add_argument("--thresholds", help="CSV of per-village/district thresholds (level,name,threshold)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (-1 for one per core)")
+    parser.add_argument("--out", help="write the bands to this CSV")
+    args = parser.parse_args()
+
+    from alerts import read_thresholds
+    from exports import select_villages
+
+    village_thresholds, district_thresholds = read_thresholds(args.thresholds) if args.thresholds else ({}, {})
+    names = select_villages(args.villages, args.district, args.block)
+    started = time.perf_counter()
+    bands = simulate(names, args.start, args.end, args.scenarios, args.shock, args.failure_prob,
+                     args.failure_offset, {v: args.deficit for v in names} if args.deficit else None,
+                     args.threshold, village_thresholds, district_thresholds, seed=args.seed, workers=args.workers)
+    elapsed = time.perf_counter() - started
+    print(f"✅ {args.scenarios} scenarios x {len(names)} villages in {elapsed:.1f}s")
+    if args.out:
+        bands.to_csv(args.out, index=False)
+        print(f"✅ Saved bands to {args.out}")
+    else:
+        print(bands.groupby("VILLAGE")["p_breach"].max().sort_values(ascending=False).head(20).to_string())
@@ -0,0 +1,250 @@
+"""
+Time-aware model selection.
+
+    python select_model.py                    # select and save models/best_model.pkl
+    python select_model.py --village Addanki  # select a single village's model
+    python select_model.py -j 4 --folds 5 --score-tolerance 0.02
+
+The global model is scored with rolling-origin cross-validation: each fold
+trains on every reading before a cutoff year and tests on that year (all
+villages), so no future readings leak into the past, and folds are scored
+by R2. A single village has about one reading a year, too few for yearly
+folds, so village models are scored on their last --holdout readings
+instead: each is predicted from a fit on all earlier readings, scored by
+mean absolute error. A village with too few readings keeps the global model.
+
+Folds are evaluated with successive halving: all candidates run on the
+earliest (cheapest) folds, and only the better half continue to the later
+ones, down to two finalists. Fits run in parallel with joblib.
+
+Single-row predict latency is measured for every candidate and is part of
+the choice: among the finalists, the fastest model whose mean score is
+within --score-tolerance of the best one wins. The winner is refitted on all
+data, saved, and a <model>.selection.json report is written next to it.
+"""
+import argparse
+import json
+import math
+import os
+import time
+
+import joblib
+import numpy as np
+from scipy import sparse
+from sklearn.base import clone
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import mean_absolute_error, r2_score
+
+from data_access import load_dataset
+from model_registry import global_model_path
+from train_models import FEATURES, build_features, model_file, village_design_matrix
+
+LATENCY_CALLS = 20
+
+# Village selection: readings held out one at a time, and the fewest readings a fit may use
+HOLDOUT_READINGS = 3
+MIN_TRAIN_READINGS = 5
+
+METRIC_LABELS = {
+    "r2": "mean R2",
+    "mae": "mean absolute error (m)",
+}
+
+
+def candidate_configs():
+    """(name, unfitted estimator) pairs; the notebook's three models plus cheaper variants."""
+    return [
+        ("LinearRegression", LinearRegression()),
+        ("RandomForest(n=200)", RandomForestRegressor(n_estimators=200, random_state=42)),
+        ("RandomForest(n=50, depth=8)", RandomForestRegressor(n_estimators=50, max_depth=8, random_state=42)),
+        ("GradientBoosting(n=200)", GradientBoostingRegressor(n_estimators=200, random_state=42)),
+        ("GradientBoosting(n=100)", GradientBoostingRegressor(n_estimators=100, random_state=42)),
+        ("GradientBoosting(n=50, depth=2)",
+         GradientBoostingRegressor(n_estimators=50, max_depth=2, random_state=42)),
+    ]
+
+
+def rolling_origin_folds(years, n_folds):
+    """(train_idx, test_idx) pairs, earliest cutoff first; each tests one year on all earlier years."""
+    cutoffs = np.unique(years)[1:][-n_folds:]
+    folds = []
+    for year in cutoffs:
+        train = np.flatnonzero(years < year)
+        test = np.flatnonzero(years == year)
+        # R2 needs at least two test readings
+        if len(train) and len(test) > 1:
+            folds.append((train, test))
+    return folds
+
+
+def holdout_folds(n_rows, k=HOLDOUT_READINGS, min_train=MIN_TRAIN_READINGS):
+    """(train_idx, test_idx) pairs for rows in date order: each of the last k rows on all rows before it."""
+    first = max(min_train, n_rows - k)
+    return [(np.arange(i), np.array([i])) for i in range(first, n_rows)]
+
+
+def _score(metric, y_true, pred):
+    # Higher is better for every metric, so MAE is negated
+    if metric == "r2":
+        return float(r2_score(y_true, pred))
+    return -float(mean_absolute_error(y_true, pred))
+
+
+def _row(X, i):
+    row = X[i:i + 1]
+    return row.toarray() if sparse.issparse(row) else row
+
+
+def predict_latency(model, row):
+    """Median seconds for a single-row predict call."""
+    model.predict(row)
+    times = []
+    for _ in range(LATENCY_CALLS):
+        t = time.perf_counter()
+        model.predict(row)
+        times.append(time.perf_counter() - t)
+    return float(np.median(times))
+
+
+def evaluate(name, estimator, X, y, train, test, metric="r2"):
+    """Fit on one fold and return its score, fit time and predict latency."""
+    model = clone(estimator)
+    t = time.perf_counter()
+    model.fit(X[train], y[train])
+    fit_time = time.perf_counter() - t
+    pred = model.predict(X[test])
+    return {
+        "name": name,
+        "score": _score(metric, y[test], pred),
+        "fit_time": fit_time,
+        "latency": predict_latency(model, _row(X, test[0])),
+    }
+
+
+def successive_halving(configs, X, y, folds, workers=-1, metric="r2", eta=2, min_finalists=2):
+    """Evaluate configs fold by fold, dropping the weaker ones; returns per-candidate results."""
+    estimators = dict(configs)
+    results = {name: [] for name in estimators}
+    eliminated = {}
+    survivors = list(estimators)
+    budget, rung = 1, 0
+
+    with joblib.Parallel(n_jobs=workers) as parallel:
+        while True:
+            tasks = [(name, f) for name in survivors for f in range(len(results[name]), budget)]
+            outputs = parallel(
+                joblib.delayed(evaluate)(name, estimators[name], X, y, *folds[f], metric) for name, f in tasks
+            )
+            for (name, _), out in zip(tasks, outputs):
+                results[name].append(out)
+
+            if budget == len(folds):
+                break
+            ranked = sorted(survivors, key=lambda n: np.mean([r["score"] for r in results[n]]), reverse=True)
+            keep = max(min_finalists, math.ceil(len(survivors) / eta))
+            for name in ranked[keep:]:
+                eliminated[name] = rung
+            survivors = ranked[:keep]
+            budget = min(len(folds), budget * eta)
+            rung += 1
+
+    summary = []
+    for name, _ in configs:
+        runs = results[name]
+        summary.append({
+            "name": name,
+            "folds": len(runs),
+            "score": float(np.mean([r["score"] for r in runs])),
+            "fit_time": float(np.mean([r["fit_time"] for r in runs])),
+            "predict_latency_ms": 1000 * float(np.median([r["latency"] for r in runs])),
+            "eliminated_at_rung": eliminated.get(name),
+        })
+    return summary
+
+
+def choose(summary, score_tolerance):
+    """Fastest finalist whose score is within score_tolerance of the best finalist."""
+    finalists = [s for s in summary if s["eliminated_at_rung"] is None]
+    best_score = max(s["score"] for s in finalists)
+    eligible = [s for s in finalists if s["score"] >= best_score - score_tolerance]
+    return min(eligible, key=lambda s: s["predict_latency_ms"])
+
+
+def select_and_save(X, y, folds, labels, feature_names, out_path, workers=-1, score_tolerance=0.01, metric="r2"):
+    """
+    Run the selection over folds, refit the winner on all rows and save it
+    with its report; labels (years or dates) name each fold's test rows.
+    Returns (None, None) without saving anything when there are no folds.
+    """
+    if not folds:
+        return None, None
+
+    configs = candidate_configs()
+    summary = successive_halving(configs, X, y, folds, workers, metric)
+    chosen = choose(summary, score_tolerance)
+
+    model = clone(dict(configs)[chosen["name"]])
+    model.fit(X, y)
+    # Sparse and array inputs carry no column names; record them as a DataFrame fit would
+    model.feature_names_in_ = np.asarray(feature_names, dtype=object)
+
+    tmp_path = out_path + ".tmp"
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, out_path)
+
+    report = {
+        "model": os.path.basename(out_path),
+        "chosen": chosen["name"],
+        "criteria": {
+            "metric": METRIC_LABELS[metric] + (" over rolling-origin folds" if metric == "r2"
+                                               else " over one-step holdouts of the last readings"),
+            "score_tolerance": score_tolerance,
+            "rule": "fastest finalist within score_tolerance of the best score",
+        },
+        "folds": [{"train_rows": len(a), "test_rows": len(b), "test": str(labels[b[0]])} for a, b in folds],
+        "candidates": summary,
+    }
+    report_path = os.path.splitext(out_path)[0] + ".selection.json"
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    return chosen, report_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Select a model with rolling-origin CV and successive halving")
+    parser.add_argument("--village", help="select a model for one village instead of the global model")
+    parser.add_argument("--out", help="where to save the chosen model")
+    parser.add_argument("--folds", type=int, default=4, help="number of rolling-origin folds")
+    parser.add_argument("--holdout", type=int, default=HOLDOUT_READINGS,
+                        help="last readings held out for a village model")
+    parser.add_argument("-j", "--workers", type=int, default=-1, help="parallel fits (-1 = all cores)")
+    parser.add_argument("--score-tolerance", type=float, default=0.01,
+                        help="score a faster model may give up against the best one (R2, or m of MAE)")
+    args = parser.parse_args()
+
+    features = build_features(load_dataset().df)
+    if args.village:
+        features = features[features["VILLAGE"].str.lower() == args.village.strip().lower()]
+        features = features.sort_values("Date", kind="stable")
+        X, names = features[FEATURES].to_numpy(dtype=np.float64), FEATURES
+        out_path = args.out or model_file(args.village.strip())
+        folds, labels, metric = holdout_folds(len(features), args.holdout), features["Date"].dt.date.to_numpy(), "mae"
+    else:
+        X, names = village_design_matrix(features)
+        out_path = args.out or global_model_path
+        years = features["Year"].to_numpy()
+        folds, labels, metric = rolling_origin_folds(years, args.folds), years, "r2"
+
+    chosen, report_path = select_and_save(
+        X, features["DTWL"].to_numpy(), folds, labels, names, out_path,
+        args.workers, args.score_tolerance, metric,
+    )
+    if chosen is None:
+        print(f"⚠️ Only {len(features)} feature rows, too few to score candidates; "
+              f"{'the village keeps the global model' if args.village else 'nothing was saved'}")
+    else:
+        score = chosen["score"] if metric == "r2" else -chosen["score"]
+        print(f"✅ Selected {chosen['name']} ({METRIC_LABELS[metric]} = {score:.4f}, "
+              f"{chosen['predict_latency_ms']:.2f} ms/predict), saved to {out_path}")
+        print(f"Report: {report_path}")
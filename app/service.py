@@ -0,0 +1,358 @@
+"""
+Headless forecast service over HTTP/JSON.
+
+Loads the global model and the dataset once and serves forecasts to other
+systems without going through the Streamlit pages:
+
+    GET  /forecast?village=Addanki&start=2025-01-01&end=2026-12-31
+    POST /forecast   {"villages": ["Addanki", "Kondur"], "start": ..., "end": ...}
+    GET  /villages   village names
+    GET  /metrics    request, batch, cache and latency counters
+    GET  /health
+
+Forecasts come from an LRU cache keyed by the model/dataset version and the
+village's live readings, then from the forecast store, and otherwise from
+the micro-batcher: requests that arrive within BATCH_WINDOW seconds of each
+other are merged into one get_predictions_batch() call per forecast start
+month (ranges that start in the same month share a path, so one call to the
+latest end serves them all).
+
+    python service.py --port 8503
+    python ../benchmarks/load_test.py --url http://127.0.0.1:8503
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from alerts import FORECAST_END, FORECAST_START
+from data_access import load_dataset
+from forecast_store import lookup, store_version
+from live import start_follower
+from predict_future import get_dataset, get_model, get_predictions_batch
+
+BATCH_WINDOW = 0.005  # seconds a batch stays open for more requests
+MAX_BATCH_VILLAGES = 2048  # a batch closes early once it has this many villages
+MAX_CACHED_FORECASTS = 50000
+MAX_MONTHS = 240  # longest forecast range served
+REQUEST_TIMEOUT = 60.0  # seconds a request waits for its batch
+
+# Latencies kept for the percentiles, and the window for the request rate
+LATENCY_SAMPLES = 10000
+RATE_WINDOW = 60.0
+
+
+class ForecastCache:
+    """LRU of forecast rows per (version, live position, village, start, end)."""
+
+    def __init__(self, size=MAX_CACHED_FORECASTS):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            rows = self._items.get(key)
+            if rows is not None:
+                self._items.move_to_end(key)
+            return rows
+
+    def put(self, key, rows):
+        with self._lock:
+            self._items[key] = rows
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def __len__(self):
+        return len(self._items)
+
+
+class Metrics:
+    """Thread-safe counters plus recent request latencies."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.counts = {}
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._finished = deque()
+        self._lock = threading.Lock()
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def request(self, seconds):
+        now = time.time()
+        with self._lock:
+            self.counts["requests"] = self.counts.get("requests", 0) + 1
+            self._latencies.append(seconds)
+            self._finished.append(now)
+            while self._finished and self._finished[0] < now - RATE_WINDOW:
+                self._finished.popleft()
+
+    def snapshot(self):
+        with self._lock:
+            counts = dict(self.counts)
+            latencies = np.array(self._latencies)
+            recent = len(self._finished)
+        uptime = time.time() - self.started
+        batches = counts.get("batches", 0)
+        lookups = counts.get("cache_hits", 0) + counts.get("cache_misses", 0)
+        report = {
+            "uptime_s": uptime,
+            "counts": counts,
+            "requests_per_s": recent / min(RATE_WINDOW, uptime) if uptime > 0 else 0.0,
+            "mean_batch_requests": counts.get("batched_requests", 0) / batches if batches else None,
+            "mean_batch_villages": counts.get("batched_villages", 0) / batches if batches else None,
+            "cache_hit_rate": counts.get("cache_hits", 0) / lookups if lookups else None,
+        }
+        if len(latencies):
+            for p in (50, 95, 99):
+                report[f"latency_p{p}_ms"] = float(np.percentile(latencies, p) * 1000)
+            report["latency_max_ms"] = float(latencies.max() * 1000)
+        return report
+
+
+class MicroBatcher:
+    """Merges concurrent forecast requests into one batched model call per start month."""
+
+    def __init__(self, metrics, window=BATCH_WINDOW, max_villages=MAX_BATCH_VILLAGES):
+        self.metrics = metrics
+        self.window = window
+        self.max_villages = max_villages
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="aquatrack-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, villages, start, end):
+        """Future of {village name: DataFrame of Date, Predicted_DTWl} for villages with a forecast."""
+        future = Future()
+        self._queue.put((villages, start, end, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            villages = len(batch[0][0])
+            deadline = time.perf_counter() + self.window
+            while villages < self.max_villages:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+                villages += len(batch[-1][0])
+            self._process(batch)
+
+    def _process(self, batch):
+        # Recursive forecasts that start in the same month follow the same path
+        groups = {}
+        for request in batch:
+            origin = request[1] + pd.offsets.MonthEnd(0)
+            groups.setdefault(origin, []).append(request)
+
+        for origin, requests in groups.items():
+            names = list({v.lower(): v for r in requests for v in r[0]}.values())
+            end = max(r[2] for r in requests)
+            try:
+                started = time.perf_counter()
+                forecast = get_predictions_batch(names, origin, end)
+                self.metrics.count("predict_ms", (time.perf_counter() - started) * 1000)
+            except Exception as exc:
+                for request in requests:
+                    request[3].set_exception(exc)
+                continue
+            self.metrics.count("batches")
+            self.metrics.count("batched_requests", len(requests))
+            self.metrics.count("batched_villages", len(names))
+
+            by_village = {
+                str(v).lower(): rows[["Date", "Predicted_DTWl"]]
+                for v, rows in forecast.groupby("VILLAGE", sort=False)
+            }
+            for villages, start, stop, future in requests:
+                result = {}
+                for v in villages:
+                    rows = by_village.get(v.lower())
+                    if rows is not None:
+                        result[v] = rows[(rows["Date"] >= start) & (rows["Date"] <= stop)].reset_index(drop=True)
+                future.set_result(result)
+
+
+class ForecastService:
+    """Cache, forecast store and micro-batcher behind the HTTP handler."""
+
+    def __init__(self, window=BATCH_WINDOW, cache_size=MAX_CACHED_FORECASTS):
+        # Load once up front so the first request does not pay for it
+        get_model()
+        get_dataset()
+        self.metrics = Metrics()
+        self.cache = ForecastCache(cache_size)
+        self.batcher = MicroBatcher(self.metrics, window)
+
+    def forecast(self, villages, start, end):
+        """{village: [{"date", "dtwl"}, ...]} for the villages with a forecast, plus the missing names."""
+        dataset = load_dataset()
+        version = store_version()
+        result, pending = {}, []
+        for v in dict.fromkeys(v.strip() for v in villages):
+            key = (version, dataset.village_version(v), v.lower(), start, end)
+            rows = self.cache.get(key)
+            if rows is not None:
+                self.metrics.count("cache_hits")
+                result[v] = rows
+                continue
+            self.metrics.count("cache_misses")
+            stored = lookup(v, start, end)
+            if stored is not None and not stored.empty:
+                rows = _records(stored)
+                self.cache.put(key, rows)
+                self.metrics.count("store_hits")
+                result[v] = rows
+            else:
+                pending.append((v, key))
+
+        if pending:
+            computed = self.batcher.submit([v for v, _ in pending], start, end).result(REQUEST_TIMEOUT)
+            for v, key in pending:
+                if v in computed:
+                    rows = _records(computed[v])
+                    self.cache.put(key, rows)
+                    result[v] = rows
+        missing = [v for v in dict.fromkeys(v.strip() for v in villages) if v not in result]
+        return result, missing
+
+
+def _records(frame):
+    return [
+        {"date": d.strftime("%Y-%m-%d"), "dtwl": round(float(x), 4)}
+        for d, x in zip(frame["Date"], frame["Predicted_DTWl"])
+    ]
+
+
+def _date_range(start, end):
+    """Parsed (start, end) timestamps; raises ValueError for bad or oversized ranges."""
+    start = pd.Timestamp(start or FORECAST_START)
+    end = pd.Timestamp(end or FORECAST_END)
+    if end < start:
+        raise ValueError("end is before start")
+    if (end.year - start.year) * 12 + end.month - start.month >= MAX_MONTHS:
+        raise ValueError(f"ranges longer than {MAX_MONTHS} months are not served")
+    return start, end
+
+
+class ForecastServer(ThreadingHTTPServer):
+    # Many clients connect at once; the default backlog of 5 resets connections
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class ForecastHandler(BaseHTTPRequestHandler):
+    """Routes requests to the server's ForecastService."""
+
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self, status, body):
+        payload = json.dumps(body, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _serve(self, villages, start, end):
+        service = self.server.service
+        started = time.perf_counter()
+        try:
+            if not villages:
+                raise ValueError("no village given")
+            start, end = _date_range(start, end)
+        except ValueError as exc:
+            service.metrics.count("bad_requests")
+            self._reply(400, {"error": str(exc)})
+            return None
+        try:
+            forecasts, missing = service.forecast(villages, start, end)
+        except Exception as exc:
+            service.metrics.count("errors")
+            self._reply(500, {"error": str(exc)})
+            return None
+        finally:
+            service.metrics.request(time.perf_counter() - started)
+        return forecasts, missing
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        service = self.server.service
+        if url.path == "/forecast":
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            village = params.get("village", "").strip()
+            served = self._serve([village] if village else [], params.get("start"), params.get("end"))
+            if served is None:
+                return
+            forecasts, missing = served
+            if missing:
+                self._reply(404, {"error": f"no forecast for village: {village}"})
+            else:
+                self._reply(200, {"village": village, "forecast": forecasts[village]})
+        elif url.path == "/villages":
+            self._reply(200, {"villages": load_dataset().villages})
+        elif url.path == "/metrics":
+            self._reply(200, dict(service.metrics.snapshot(), cached_forecasts=len(service.cache)))
+        elif url.path == "/health":
+            self._reply(200, {"status": "ok", "version": store_version()})
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/forecast":
+            self._reply(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            villages = body.get("villages") or []
+            if isinstance(villages, str) or not all(isinstance(v, str) for v in villages):
+                raise ValueError("villages must be a list of names")
+        except (ValueError, AttributeError) as exc:
+            self.server.service.metrics.count("bad_requests")
+            self._reply(400, {"error": f"invalid request: {exc}"})
+            return
+        served = self._serve(villages, body.get("start"), body.get("end"))
+        if served is not None:
+            forecasts, missing = served
+            self._reply(200, {"forecasts": forecasts, "missing": missing})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host="127.0.0.1", window=BATCH_WINDOW):
+    server = ForecastServer((host, port), ForecastHandler)
+    server.service = ForecastService(window)
+    # Apply live readings as the dashboards do; their villages miss the cache
+    start_follower()
+    print(f"✅ Serving forecasts on http://{host}:{port}/forecast")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve forecasts over HTTP/JSON with request micro-batching")
+    parser.add_argument("--port", type=int, default=8503)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--window-ms", type=float, default=BATCH_WINDOW * 1000,
+                        help="how long a batch waits for more requests")
+    args = parser.parse_args()
+
+    serve(args.port, args.host, args.window_ms / 1000)
@@ -0,0 +1,219 @@
+"""
+Spatial queries over the monitoring stations.
+
+Every distinct (village, district, latitude, longitude) in the dataset is a
+station. StationIndex builds a ball tree over the station coordinates with
+the haversine metric, so nearest-station and radius queries take
+milliseconds instead of a loop over every station:
+
+    index = get_index()
+    index.nearest(16.30, 80.44, k=5)          # five closest stations
+    index.within(16.30, 80.44, radius_km=10)  # stations within 10 km
+
+interpolate() estimates the depth to water level at arbitrary points by
+inverse-distance weighting of the k nearest stations' latest readings, and
+interpolate_forecast() does the same for forecast months. grid() gives the
+points of a regular lat/lon grid to interpolate onto.
+
+The index is built once per dataset and shared by every session. Live
+readings refresh the latest reading of their stations in place; only a
+reading at a new station location rebuilds the tree.
+
+    python spatial.py 16.30 80.44 --radius 10
+"""
+import argparse
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data_access import load_dataset
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Neighbours and distance power used for inverse-distance weighting
+IDW_NEIGHBOURS = 8
+IDW_POWER = 2
+
+# Points closer than this to a station take the station's value
+SNAP_KM = 1e-3
+
+STATION_COLUMNS = ["VILLAGE", "DISTRICT", "LATITUDE", "LONGITUDE"]
+
+_lock = threading.Lock()
+_index = None
+
+
+def _radians(lat, lon):
+    return np.radians(np.column_stack([np.atleast_1d(lat), np.atleast_1d(lon)]).astype(np.float64))
+
+
+class StationIndex:
+    """Ball tree over station coordinates plus each station's latest reading."""
+
+    def __init__(self, df):
+        # scikit-learn is slow to import; only pay for it when an index is built
+        from sklearn.neighbors import BallTree
+
+        df = df.dropna(subset=["LATITUDE", "LONGITUDE"])
+        # df is sorted by village and date, so the last row per station is its latest reading
+        stations = df.groupby(STATION_COLUMNS, sort=False, observed=True).agg(
+            latest_date=("Date", "last"),
+            latest_depth=("DTWL", "last"),
+            readings=("DTWL", "size"),
+        ).reset_index()
+        stations["VILLAGE"] = stations["VILLAGE"].astype(str)
+        stations["DISTRICT"] = stations["DISTRICT"].astype(str)
+
+        self.stations = stations
+        self.tree = BallTree(_radians(stations["LATITUDE"], stations["LONGITUDE"]), metric="haversine")
+        self._position = {key: i for i, key in enumerate(stations[STATION_COLUMNS].itertuples(index=False, name=None))}
+
+    def update(self, dataset, rows):
+        """Refresh the latest reading of the stations in rows from dataset; False if one is a new station."""
+        rows = rows.dropna(subset=["LATITUDE", "LONGITUDE"])
+        stations = self.stations.copy()
+        for key in rows[STATION_COLUMNS].drop_duplicates().itertuples(index=False, name=None):
+            pos = self._position.get(key)
+            if pos is None:
+                return False
+            village, district, lat, lon = key
+            history = dataset.village(village)
+            history = history[(history["DISTRICT"].astype(str) == district)
+                              & (history["LATITUDE"] == lat) & (history["LONGITUDE"] == lon)]
+            stations.loc[pos, ["latest_date", "latest_depth", "readings"]] = [
+                history["Date"].iloc[-1], history["DTWL"].iloc[-1], len(history)
+            ]
+        # Swapped whole so concurrent queries see either the old or the new readings
+        self.stations = stations
+        return True
+
+    def nearest(self, lat, lon, k=5):
+        """The k stations closest to (lat, lon), nearest first, with a distance_km column."""
+        k = min(k, len(self.stations))
+        dist, idx = self.tree.query(_radians(lat, lon), k=k)
+        return self._rows(idx[0], dist[0])
+
+    def within(self, lat, lon, radius_km):
+        """Stations within radius_km of (lat, lon), nearest first, with a distance_km column."""
+        idx, dist = self.tree.query_radius(
+            _radians(lat, lon), r=radius_km / EARTH_RADIUS_KM, return_distance=True, sort_results=True
+        )
+        return self._rows(idx[0], dist[0])
+
+    def _rows(self, idx, dist):
+        rows = self.stations.iloc[idx].reset_index(drop=True)
+        rows["distance_km"] = dist * EARTH_RADIUS_KM
+        return rows
+
+    def weights(self, lat, lon, k=IDW_NEIGHBOURS, power=IDW_POWER):
+        """(station indices, normalized weights), each (points, k), for inverse-distance weighting."""
+        k = min(k, len(self.stations))
+        dist, idx = self.tree.query(_radians(lat, lon), k=k)
+        dist_km = dist * EARTH_RADIUS_KM
+
+        w = 1.0 / np.maximum(dist_km, SNAP_KM) ** power
+        # A point on top of a station gets that station's value
+        snapped = dist_km[:, 0] < SNAP_KM
+        w[snapped] = 0.0
+        w[snapped, 0] = 1.0
+        return idx, w / w.sum(axis=1, keepdims=True)
+
+    def interpolate(self, lat, lon, values=None, k=IDW_NEIGHBOURS, power=IDW_POWER):
+        """Inverse-distance estimate at each point of per-station values (default: latest DTWL).
+
+        values may be (stations,) or (stations, columns); the result is
+        (points,) or (points, columns) accordingly.
+        """
+        if values is None:
+            values = self.stations["latest_depth"].to_numpy(dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        idx, w = self.weights(lat, lon, k, power)
+        if values.ndim == 1:
+            return (values[idx] * w).sum(axis=1)
+        return np.einsum("pk,pkc->pc", w, values[idx])
+
+    def interpolate_forecast(self, lat, lon, start_date, end_date, k=IDW_NEIGHBOURS, power=IDW_POWER):
+        """Forecast DTWL at each point: IDW of the neighbouring stations' forecasts.
+
+        Only the stations that are a neighbour of some point are forecast.
+        Returns columns point, LATITUDE, LONGITUDE, Date, Predicted_DTWl.
+        """
+        # Imported here so plain level queries do not load the models
+        from predict_future import get_predictions_batch
+
+        lat, lon = np.atleast_1d(lat), np.atleast_1d(lon)
+        idx, w = self.weights(lat, lon, k, power)
+        used = np.unique(idx)
+        names = self.stations["VILLAGE"].to_numpy()[used]
+
+        forecast = get_predictions_batch(names, start_date, end_date)
+        if forecast.empty:
+            return pd.DataFrame(columns=["point", "LATITUDE", "LONGITUDE", "Date", "Predicted_DTWl"])
+        table = forecast.pivot(index="VILLAGE", columns="Date", values="Predicted_DTWl")
+        table.index = table.index.str.lower()
+
+        # Stations without a forecast (fewer than two readings) are left out of the weighting
+        values = table.reindex([n.lower() for n in names]).to_numpy(dtype=np.float64)
+        station_values = np.full((len(self.stations), values.shape[1]), np.nan)
+        station_values[used] = values
+        neighbour = station_values[idx]
+        w = np.where(np.isnan(neighbour[:, :, 0]), 0.0, w)
+        w = w / np.where(w.sum(axis=1, keepdims=True) > 0, w.sum(axis=1, keepdims=True), np.nan)
+        predictions = np.einsum("pk,pkc->pc", w, np.nan_to_num(neighbour))
+
+        dates = table.columns
+        return pd.DataFrame({
+            "point": np.repeat(np.arange(len(lat)), len(dates)),
+            "LATITUDE": np.repeat(lat, len(dates)),
+            "LONGITUDE": np.repeat(lon, len(dates)),
+            "Date": np.tile(dates, len(lat)),
+            "Predicted_DTWl": predictions.ravel(),
+        })
+
+
+def grid(lat_min, lat_max, lon_min, lon_max, step=0.05):
+    """(lat, lon) arrays of a regular grid covering the bounding box, step in degrees."""
+    lats = np.arange(lat_min, lat_max + step / 2, step)
+    lons = np.arange(lon_min, lon_max + step / 2, step)
+    lat, lon = np.meshgrid(lats, lons, indexing="ij")
+    return lat.ravel(), lon.ravel()
+
+
+def get_index():
+    """The process-wide StationIndex, kept up to date with the shared dataset's live readings."""
+    global _index
+    dataset = load_dataset()
+    index = _index
+    if index is None or index[0] is not dataset:
+        with _lock:
+            if _index is None or _index[0] is not dataset:
+                version = dataset.version
+                _index = (dataset, StationIndex(dataset.df))
+
+                def refresh(rows):
+                    global _index
+                    with _lock:
+                        if _index[0] is dataset and not _index[1].update(dataset, rows):
+                            _index = (dataset, StationIndex(dataset.df))
+
+                dataset.subscribe(refresh)
+                # Readings applied while the index was built
+                if dataset.version != version:
+                    _index = (dataset, StationIndex(dataset.df))
+            index = _index
+    return index[1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Nearest monitoring stations and interpolated level at a point")
+    parser.add_argument("lat", type=float)
+    parser.add_argument("lon", type=float)
+    parser.add_argument("-k", type=int, default=5, help="nearest stations to list")
+    parser.add_argument("--radius", type=float, help="list stations within this many km instead")
+    args = parser.parse_args()
+
+    index = get_index()
+    stations = index.within(args.lat, args.lon, args.radius) if args.radius else index.nearest(args.lat, args.lon, args.k)
+    print(stations[["VILLAGE", "DISTRICT", "distance_km", "latest_date", "latest_depth"]].to_string(index=False))
+    print(f"Estimated depth to water level: {index.interpolate(args.lat, args.lon)[0]:.2f} m")
@@ -0,0 +1,281 @@
+"""
+Scriptable training for the global and per-village models.
+
+    python train_models.py            # retrain villages whose data changed
+    python train_models.py --global   # also refit models/best_model.pkl
+    python train_models.py --all -j 8 # retrain every village on 8 cores
+    python train_models.py --direct   # also fit the direct multi-horizon model
+
+Lag1/Lag2/Year/Month features are built for the whole dataset with grouped
+shifts. Each village's observations are fingerprinted and the fingerprints
+are kept in models/training_manifest.json, so only villages with new or
+changed readings get their <Village>_best_model.pkl refitted. Those fits run
+in parallel. The global model one-hot encodes villages as a sparse matrix
+with the same VILLAGE_* columns the notebook produced.
+
+Every model is chosen the way select_model.py chooses it (successive halving
+over time-ordered folds, see there): the global and direct models on
+rolling-origin folds by year, village models on holdouts of their last
+readings. Each saved model gets its <model>.selection.json report.
+
+The direct multi-horizon model predicts a reading from the two readings
+before some origin plus the number of months between them (Horizon), so a
+whole forecast range can be predicted in one batch instead of recursively.
+Readings are mostly taken once a year (May), so nearly every training
+Horizon is a multiple of 12; the horizons seen are saved next to the model
+and direct forecasts are only served for those.
+"""
+import argparse
+import hashlib
+import json
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from data_access import load_dataset
+from model_registry import MODEL_SUFFIX, direct_model_path, global_model_path, horizons_path, models_dir
+
+FEATURES = ["Year", "Month", "Lag1", "Lag2"]
+DIRECT_FEATURES = FEATURES + ["Horizon"]
+
+# Longest horizon, in months, the direct model is trained on
+MAX_HORIZON = 120
+
+# Rolling-origin folds (test years) for the global and direct models
+GLOBAL_FOLDS = 4
+MANIFEST_NAME = "training_manifest.json"
+
+# Villages with fewer observations than this get no model of their own
+MIN_VILLAGE_ROWS = 10
+
+# Bump when the candidates or features change so every village is refitted
+TRAINING_VERSION = "2"
+
+
+def build_features(df):
+    """Lag/date features for every row with two earlier readings in its village.
+
+    df must be sorted by village and date (as VillageDataset.df is).
+    Returns a frame with VILLAGE, Date, DTWL and the FEATURES columns.
+    """
+    key = df["VILLAGE"].astype(str).str.lower()
+    dtwl = df["DTWL"]
+    grouped = dtwl.groupby(key.to_numpy(), sort=False)
+    features = pd.DataFrame({
+        "VILLAGE": df["VILLAGE"].astype(str),
+        "Date": df["Date"],
+        "DTWL": dtwl,
+        "Year": df["Date"].dt.year,
+        "Month": df["Date"].dt.month,
+        "Lag1": grouped.shift(1),
+        "Lag2": grouped.shift(2),
+    })
+    return features.dropna(subset=["Lag1", "Lag2"]).reset_index(drop=True)
+
+
+def build_horizon_features(df, max_horizon=MAX_HORIZON):
+    """Training rows for the direct model, one per (origin, later reading) pair in a village.
+
+    Lag1/Lag2 are the readings at and before the origin; Year/Month/DTWL
+    describe the later reading and Horizon is the months between the two.
+    df must be sorted by village and date.
+    """
+    key = df["VILLAGE"].astype(str).str.lower().to_numpy()
+    bounds = np.flatnonzero(key[1:] != key[:-1]) + 1
+    starts = np.concatenate(([0], bounds))
+    stops = np.concatenate((bounds, [len(df)]))
+
+    # Positions (origin, target) with origin >= 1 so Lag2 exists, origin < target
+    origins, targets = [], []
+    pairs = {}
+    for a, b in zip(starts, stops):
+        n = b - a
+        if n < 3:
+            continue
+        if n not in pairs:
+            i, j = np.triu_indices(n, k=1)
+            keep = i >= 1
+            pairs[n] = (i[keep], j[keep])
+        i, j = pairs[n]
+        origins.append(a + i)
+        targets.append(a + j)
+    if not origins:
+        return pd.DataFrame(columns=["VILLAGE", "Date", "DTWL"] + DIRECT_FEATURES)
+    origins = np.concatenate(origins)
+    targets = np.concatenate(targets)
+
+    dates = df["Date"]
+    years = dates.dt.year.to_numpy()
+    months = dates.dt.month.to_numpy()
+    dtwl = df["DTWL"].to_numpy()
+    horizon = (years[targets] - years[origins]) * 12 + (months[targets] - months[origins])
+
+    features = pd.DataFrame({
+        "VILLAGE": df["VILLAGE"].astype(str).to_numpy()[targets],
+        "Date": dates.to_numpy()[targets],
+        "DTWL": dtwl[targets],
+        "Year": years[targets],
+        "Month": months[targets],
+        "Lag1": dtwl[origins],
+        "Lag2": dtwl[origins - 1],
+        "Horizon": horizon,
+    })
+    return features[(features["Horizon"] > 0) & (features["Horizon"] <= max_horizon)].reset_index(drop=True)
+
+
+def village_fingerprints(df):
+    """Hash of each village's (Date, DTWL) readings, keyed by village name."""
+    fingerprints = {}
+    key = df["VILLAGE"].astype(str).str.lower().to_numpy()
+    bounds = np.flatnonzero(key[1:] != key[:-1]) + 1
+    starts = np.concatenate(([0], bounds))
+    stops = np.concatenate((bounds, [len(df)]))
+    dates = df["Date"].to_numpy().astype("datetime64[ns]").view(np.int64)
+    values = df["DTWL"].to_numpy(dtype=np.float64)
+    names = df["VILLAGE"].astype(str).to_numpy()
+    for a, b in zip(starts, stops):
+        h = hashlib.sha256(TRAINING_VERSION.encode())
+        h.update(dates[a:b].tobytes())
+        h.update(values[a:b].tobytes())
+        fingerprints[names[a]] = h.hexdigest()
+    return fingerprints
+
+
+def select_best(X, y, feature_names, folds, labels, path, metric="r2", workers=1):
+    """
+    Choose a model with select_model's selection over folds and save it to
+    path with its report. Returns (name, score), the score as R2 or as MAE
+    in m, or (None, None) with nothing saved when there are no folds.
+    """
+    # select_model imports this module
+    from select_model import select_and_save
+
+    chosen, _ = select_and_save(X, y, folds, labels, feature_names, path, workers, metric=metric)
+    if chosen is None:
+        return None, None
+    return chosen["name"], chosen["score"] if metric == "r2" else -chosen["score"]
+
+
+def model_file(village, directory=models_dir):
+    return os.path.join(directory, f"{village}{MODEL_SUFFIX}")
+
+
+def _train_village(village, frame, directory):
+    from select_model import holdout_folds
+
+    frame = frame.sort_values("Date", kind="stable")
+    name, mae = select_best(frame[FEATURES].to_numpy(dtype=np.float64), frame["DTWL"].to_numpy(), FEATURES,
+                            holdout_folds(len(frame)), frame["Date"].dt.date.to_numpy(),
+                            model_file(village, directory), metric="mae")
+    return village, name, mae
+
+
+def train_villages(features, fingerprints, directory=models_dir, workers=-1, retrain_all=False):
+    """Refit models for villages whose fingerprint changed; returns the trained (village, model, MAE)."""
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    manifest = {}
+    if os.path.exists(manifest_path) and not retrain_all:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    counts = features.groupby("VILLAGE").size()
+    todo = [
+        v for v, fp in fingerprints.items()
+        # every feature row has two earlier readings behind it
+        if counts.get(v, 0) + 2 >= MIN_VILLAGE_ROWS
+        and (manifest.get(v) != fp or not os.path.exists(model_file(v, directory)))
+    ]
+    if not todo:
+        return []
+
+    groups = dict(tuple(features[features["VILLAGE"].isin(todo)].groupby("VILLAGE")))
+    results = joblib.Parallel(n_jobs=workers)(
+        joblib.delayed(_train_village)(v, groups[v], directory) for v in todo
+    )
+
+    # A village too short for holdouts has nothing saved and keeps the global model
+    results = [r for r in results if r[1] is not None]
+    for village, _, _ in results:
+        manifest[village] = fingerprints[village]
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=0, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+    return results
+
+
+def village_design_matrix(features, columns=FEATURES):
+    """Sparse [columns..., VILLAGE_*] matrix, dropping the first village like get_dummies."""
+    villages = pd.Categorical(features["VILLAGE"])
+    n_villages = len(villages.categories)
+    one_hot = sparse.csr_matrix(
+        (np.ones(len(features)), (np.arange(len(features)), villages.codes)),
+        shape=(len(features), n_villages),
+    )[:, 1:]
+    X = sparse.hstack([sparse.csr_matrix(features[columns].to_numpy(dtype=np.float64)), one_hot], format="csr")
+    names = list(columns) + [f"VILLAGE_{v}" for v in villages.categories[1:]]
+    return X, names
+
+
+def train_global(features, path=global_model_path, n_folds=GLOBAL_FOLDS, workers=-1):
+    from select_model import rolling_origin_folds
+
+    X, names = village_design_matrix(features)
+    years = features["Year"].to_numpy()
+    return select_best(X, features["DTWL"].to_numpy(), names, rolling_origin_folds(years, n_folds), years, path,
+                       workers=workers)
+
+
+def train_direct(df, path=direct_model_path, max_horizon=MAX_HORIZON, n_folds=GLOBAL_FOLDS, workers=-1):
+    from select_model import rolling_origin_folds
+
+    features = build_horizon_features(df, max_horizon)
+    X, names = village_design_matrix(features, DIRECT_FEATURES)
+    # Folds split on the target reading's year, so every origin is before the cutoff too
+    years = features["Year"].to_numpy()
+    name, r2 = select_best(X, features["DTWL"].to_numpy(), names, rolling_origin_folds(years, n_folds), years, path,
+                           workers=workers)
+    if name is not None:
+        with open(horizons_path(path), "w") as f:
+            json.dump(sorted(int(h) for h in features["Horizon"].unique()), f)
+    return name, r2
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Retrain groundwater models for villages with new readings")
+    parser.add_argument("--models-dir", default=models_dir, help="directory of <Village>_best_model.pkl files")
+    parser.add_argument("-j", "--workers", type=int, default=-1, help="parallel fits (-1 = all cores)")
+    parser.add_argument("--all", action="store_true", help="retrain every village, ignoring fingerprints")
+    parser.add_argument("--global", dest="train_global", action="store_true", help="also refit best_model.pkl")
+    parser.add_argument("--direct", action="store_true", help="also fit the direct multi-horizon model")
+    parser.add_argument("--folds", type=int, default=GLOBAL_FOLDS,
+                        help="rolling-origin folds for the global and direct models")
+    args = parser.parse_args()
+
+    df = load_dataset().df
+    features = build_features(df)
+    fingerprints = village_fingerprints(df)
+
+    trained = train_villages(features, fingerprints, args.models_dir, args.workers, args.all)
+    for village, name, mae in trained:
+        print(f"{village}: {name} (MAE = {mae:.4f} m)")
+    print(f"✅ Retrained {len(trained)} village models")
+
+    if args.train_global:
+        name, r2 = train_global(features, os.path.join(args.models_dir, os.path.basename(global_model_path)),
+                                args.folds, args.workers)
+        if name is None:
+            print("⚠️ Too few years for rolling-origin folds; the global model was not refitted")
+        else:
+            print(f"✅ Best global model: {name} with R2 = {r2:.4f}")
+
+    if args.direct:
+        name, r2 = train_direct(df, os.path.join(args.models_dir, os.path.basename(direct_model_path)),
+                                MAX_HORIZON, args.folds, args.workers)
+        if name is None:
+            print("⚠️ Too few years for rolling-origin folds; the direct model was not refitted")
+        else:
+            print(f"✅ Best direct multi-horizon model: {name} with R2 = {r2:.4f}")
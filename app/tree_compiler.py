@@ -0,0 +1,215 @@
+"""
+Compile fitted models into flat NumPy arrays for fast inference.
+
+A RandomForestRegressor or GradientBoostingRegressor is flattened into one set
+of node arrays (feature, threshold, left, right, value) covering every node of
+every tree. CompiledModel.predict walks all trees for a whole batch of rows at
+once with vectorized indexing, avoiding sklearn's per-call validation and
+per-tree dispatch. LinearRegression models compile to their coefficients.
+
+The compiled form is saved next to the pickle as <name>.compiled.npz:
+
+    python tree_compiler.py ../models/best_model.pkl --verify
+
+ModelRegistry picks up a compiled file automatically when it matches the
+pickle it was built from.
+"""
+import argparse
+import hashlib
+import os
+
+import joblib
+import numpy as np
+
+COMPILED_SUFFIX = ".compiled.npz"
+
+
+def compiled_path(model_path):
+    """Path of the compiled form saved next to model_path."""
+    root, _ = os.path.splitext(model_path)
+    return root + COMPILED_SUFFIX
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _flatten_trees(trees, scale):
+    """Concatenate sklearn Tree objects, with child links rewritten to global node ids."""
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    for tree in trees:
+        t = tree.tree_
+        leaf = t.children_left == -1
+        features.append(np.where(leaf, 0, t.feature).astype(np.int32))
+        thresholds.append(t.threshold.astype(np.float64))
+        lefts.append(np.where(leaf, -1, t.children_left + offset).astype(np.int32))
+        rights.append(np.where(leaf, -1, t.children_right + offset).astype(np.int32))
+        values.append(t.value[:, 0, 0] * scale)
+        roots.append(offset)
+        offset += t.node_count
+    return {
+        "feature": np.concatenate(features),
+        "threshold": np.concatenate(thresholds),
+        "left": np.concatenate(lefts),
+        "right": np.concatenate(rights),
+        "value": np.concatenate(values),
+        "roots": np.array(roots, dtype=np.int32),
+        "max_depth": np.array(max(tree.tree_.max_depth for tree in trees)),
+    }
+
+
+def compile_model(model):
+    """Flatten a fitted regressor into a dict of arrays (see CompiledModel)."""
+    name = type(model).__name__
+    arrays = {"feature_names": np.array(model.feature_names_in_, dtype=str)}
+
+    if name == "RandomForestRegressor":
+        trees = model.estimators_
+        arrays.update(_flatten_trees(trees, 1.0 / len(trees)))
+        arrays["base"] = np.array(0.0)
+    elif name == "GradientBoostingRegressor":
+        if model.loss != "squared_error":
+            raise ValueError(f"Unsupported GradientBoosting loss: {model.loss}")
+        if model.init_ == "zero":
+            base = 0.0
+        elif type(model.init_).__name__ == "DummyRegressor":
+            base = float(np.ravel(model.init_.constant_)[0])
+        else:
+            raise ValueError(f"Unsupported GradientBoosting init: {type(model.init_).__name__}")
+        arrays.update(_flatten_trees(model.estimators_[:, 0], model.learning_rate))
+        arrays["base"] = np.array(base)
+    elif name == "LinearRegression":
+        arrays["coef"] = np.ravel(model.coef_).astype(np.float64)
+        arrays["base"] = np.array(float(np.ravel(model.intercept_)[0]))
+    else:
+        raise ValueError(f"Cannot compile model of type {name}")
+
+    arrays["kind"] = np.array(name)
+    return arrays
+
+
+class CompiledModel:
+    """Drop-in replacement for the fitted model's predict() built from compile_model arrays."""
+
+    def __init__(self, arrays):
+        self.kind = str(arrays["kind"])
+        self.feature_names_in_ = np.asarray(arrays["feature_names"], dtype=object)
+        self.n_features_in_ = len(self.feature_names_in_)
+        self.base = float(arrays["base"])
+        if self.kind == "LinearRegression":
+            self.coef = arrays["coef"]
+            return
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.max_depth = int(arrays["max_depth"])
+
+    def leaf_values(self, X):
+        """Per-tree contributions, shape (rows, trees); predict() is base + their row sum."""
+        # sklearn compares float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            left = self.left[node]
+            internal = left != -1
+            if not internal.any():
+                break
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(internal, np.where(go_left, left, self.right[node]), node)
+        return self.value[node]
+
+    def predict(self, X):
+        if self.kind == "LinearRegression":
+            return np.asarray(X, dtype=np.float64) @ self.coef + self.base
+        return self.base + self.leaf_values(X).sum(axis=1)
+
+
+def _source_stat(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def save_compiled(arrays, path, source_path=None):
+    arrays = dict(arrays)
+    if source_path is not None:
+        size, mtime_ns = _source_stat(source_path)
+        arrays["source_digest"] = np.array(file_digest(source_path))
+        arrays["source_size"] = np.array(size)
+        arrays["source_mtime_ns"] = np.array(mtime_ns)
+    np.savez(path, **arrays)
+    return path
+
+
+def _is_source(arrays, source_path):
+    """True if the compiled arrays were built from the pickle at source_path."""
+    size, mtime_ns = _source_stat(source_path)
+    if "source_size" in arrays:
+        if int(arrays["source_size"]) != size:
+            return False
+        # Unchanged size and mtime: skip hashing the whole pickle
+        if int(arrays["source_mtime_ns"]) == mtime_ns:
+            return True
+    return str(arrays.get("source_digest", "")) == file_digest(source_path)
+
+
+def load_compiled(path, source_path=None):
+    """Load a compiled model; returns None if it was built from a different source pickle."""
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {k: data[k] for k in data.files}
+    if source_path is not None and not _is_source(arrays, source_path):
+        return None
+    return CompiledModel(arrays)
+
+
+def _verification_rows(compiled, n_rows=2000, seed=0):
+    # Spread each feature across the range of thresholds that split on it
+    rng = np.random.default_rng(seed)
+    X = rng.integers(0, 2, size=(n_rows, compiled.n_features_in_)).astype(np.float64)
+    if compiled.kind == "LinearRegression":
+        return X
+    internal = compiled.left != -1
+    for f in np.unique(compiled.feature[internal]):
+        t = compiled.threshold[internal & (compiled.feature == f)]
+        X[:, f] = rng.uniform(t.min() - 1, t.max() + 1, size=n_rows)
+    return X
+
+
+def compile_file(model_path, verify=False):
+    """Compile the model pickled at model_path and save it next to the pickle."""
+    model = joblib.load(model_path)
+    arrays = compile_model(model)
+    path = save_compiled(arrays, compiled_path(model_path), source_path=model_path)
+
+    if verify:
+        compiled = CompiledModel(arrays)
+        X = _verification_rows(compiled)
+        import pandas as pd
+        expected = model.predict(pd.DataFrame(X, columns=model.feature_names_in_))
+        if not np.allclose(compiled.predict(X), expected, rtol=1e-9, atol=1e-9):
+            os.remove(path)
+            raise ValueError(f"Compiled predictions for {model_path} do not match model.predict")
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile fitted models into flat NumPy arrays")
+    parser.add_argument("models", nargs="+", help="model .pkl files to compile")
+    parser.add_argument("--verify", action="store_true", help="check compiled output against model.predict")
+    args = parser.parse_args()
+
+    for model_path in args.models:
+        try:
+            path = compile_file(model_path, verify=args.verify)
+        except Exception as exc:
+            print(f"⚠️ Skipped {model_path}: {exc}")
+        else:
+            print(f"✅ Saved {path}")
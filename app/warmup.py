@@ -0,0 +1,136 @@
+"""
+Background warm-up of the shared caches.
+
+Nothing heavy is loaded when the app modules are imported. start_warmup()
+starts one daemon thread per process that loads the dataset, the global
+model, the forecast store and matplotlib (the READY_STEPS the first page
+needs), then builds the spatial index, the aggregate cube and the alert
+scanner. The splash screen waits on ready() instead of sleeping for a fixed
+time, and a later session in a warm process skips it straight away.
+
+Every step also loads lazily on first use, so a page that is reached before
+the warm-up gets there just loads what it needs itself.
+
+Set AQUATRACK_WARMUP=0 to skip the background thread.
+"""
+import os
+import threading
+import time
+
+_started_at = time.perf_counter()
+
+_lock = threading.Lock()
+_thread = None
+_status = {"step": None, "done": [], "failed": {}, "ready_s": None, "finished_s": None, "first_page_s": None}
+_ready = threading.Event()
+_finished = threading.Event()
+
+
+def _load_dataset():
+    from data_access import load_dataset
+    load_dataset()
+
+
+def _load_model():
+    from predict_future import get_dataset, get_model
+    get_dataset()
+    get_model()
+
+
+def _load_forecast_store():
+    from forecast_store import load_store
+    load_store()
+
+
+def _load_charts():
+    from charts import load_matplotlib
+    load_matplotlib()
+
+
+def _build_spatial_index():
+    from spatial import get_index
+    get_index()
+
+
+def _build_aggregate_cube():
+    from aggregates import get_cube
+    get_cube()
+
+
+def _scan_alerts():
+    from alerts import get_scanner
+    get_scanner()
+
+
+# (name, loader); the first READY_STEPS are what the first interactive page needs
+STEPS = [
+    ("dataset", _load_dataset),
+    ("model", _load_model),
+    ("forecast_store", _load_forecast_store),
+    ("charts", _load_charts),
+    ("spatial_index", _build_spatial_index),
+    ("aggregate_cube", _build_aggregate_cube),
+    ("alerts", _scan_alerts),
+]
+READY_STEPS = 4
+
+
+def _run():
+    for i, (name, load) in enumerate(STEPS):
+        _status["step"] = name
+        try:
+            load()
+        except Exception as exc:
+            # The page will load it again on first use and surface the error there
+            _status["failed"][name] = str(exc)
+            print(f"Warm-up: {name} failed: {exc}")
+        else:
+            _status["done"].append(name)
+        if i + 1 == READY_STEPS:
+            _status["ready_s"] = time.perf_counter() - _started_at
+            _ready.set()
+    _status["step"] = None
+    _status["finished_s"] = time.perf_counter() - _started_at
+    _ready.set()
+    _finished.set()
+    print(f"Warm-up: ready in {_status['ready_s']:.2f}s, finished in {_status['finished_s']:.2f}s")
+
+
+def start_warmup():
+    """Start the warm-up thread once per process (no-op if disabled or already started)."""
+    global _thread
+    if _thread is not None:
+        return
+    with _lock:
+        if _thread is not None:
+            return
+        if os.environ.get("AQUATRACK_WARMUP", "1") == "0":
+            _thread = False
+            _ready.set()
+            _finished.set()
+            return
+        _thread = threading.Thread(target=_run, name="aquatrack-warmup", daemon=True)
+        _thread.start()
+
+
+def ready(timeout=None):
+    """Wait up to timeout seconds for the first page's caches; True once they are loaded."""
+    return _ready.wait(timeout)
+
+
+def progress():
+    """(steps done or failed, READY_STEPS, current step name)."""
+    return len(_status["done"]) + len(_status["failed"]), READY_STEPS, _status["step"]
+
+
+def mark_first_page():
+    """Record (once per process) the seconds from start-up to the first interactive page."""
+    with _lock:
+        if _status["first_page_s"] is None:
+            _status["first_page_s"] = time.perf_counter() - _started_at
+            print(f"Startup: first interactive page after {_status['first_page_s']:.2f}s")
+    return _status["first_page_s"]
+
+
+def status():
+    return dict(_status, done=list(_status["done"]), failed=dict(_status["failed"]))
@@ -0,0 +1,130 @@
+"""
+Load test for the forecast service (app/service.py).
+
+    python benchmarks/load_test.py --url http://127.0.0.1:8503 --concurrency 32 --requests 2000
+    python benchmarks/load_test.py --batch 20      # POST 20 villages per request instead
+
+Clients pick villages at random from the service's /villages list and send
+GET /forecast (or POST /forecast with --batch villages) over keep-alive
+connections. Reports throughput, the client-side latency percentiles and
+the service's own batching and cache metrics. Use --cold to give every
+request a forecast range of its own so the cache cannot answer it.
+"""
+import argparse
+import http.client
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urlparse
+
+import numpy as np
+
+
+class Client:
+    """One keep-alive connection to the service."""
+
+    def __init__(self, url):
+        parsed = urlparse(url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self.conn = None
+
+    def request(self, method, path, body=None):
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            try:
+                payload = json.dumps(body).encode() if body is not None else None
+                headers = {"Content-Type": "application/json"} if payload else {}
+                self.conn.request(method, path, body=payload, headers=headers)
+                response = self.conn.getresponse()
+                return response.status, json.loads(response.read())
+            except (http.client.HTTPException, ConnectionError):
+                # The server closed the connection; reconnect once
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+
+
+def run(url, concurrency, n_requests, batch, start, end, cold, seed):
+    villages = Client(url).request("GET", "/villages")[1]["villages"]
+    rng = np.random.default_rng(seed)
+    plans = []
+    for i in range(n_requests):
+        names = [villages[j] for j in rng.choice(len(villages), size=batch, replace=False)]
+        # Shifting the end by a day keeps the path but makes a new cache key
+        stop = (np.datetime64(end) + (i % 28 if cold else 0)).astype(str)
+        plans.append((names, start, stop))
+
+    local = threading.local()
+    latencies = np.empty(n_requests)
+    statuses = {}
+    lock = threading.Lock()
+
+    def send(i):
+        if not hasattr(local, "client"):
+            local.client = Client(url)
+        names, first, last = plans[i]
+        t = time.perf_counter()
+        if batch == 1:
+            path = f"/forecast?village={quote(names[0])}&start={first}&end={last}"
+            status, _ = local.client.request("GET", path)
+        else:
+            status, _ = local.client.request("POST", "/forecast", {"villages": names, "start": first, "end": last})
+        latencies[i] = time.perf_counter() - t
+        with lock:
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(send, range(n_requests)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": n_requests,
+        "concurrency": concurrency,
+        "villages_per_request": batch,
+        "elapsed_s": elapsed,
+        "requests_per_s": n_requests / elapsed,
+        "statuses": statuses,
+        "latency_p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "latency_p95_ms": float(np.percentile(latencies, 95) * 1000),
+        "latency_p99_ms": float(np.percentile(latencies, 99) * 1000),
+        "service": Client(url).request("GET", "/metrics")[1],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the forecast service")
+    parser.add_argument("--url", default="http://127.0.0.1:8503")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=2000, help="total requests")
+    parser.add_argument("--batch", type=int, default=1, help="villages per request (POST when above 1)")
+    parser.add_argument("--start", default="2025-01-01")
+    parser.add_argument("--end", default="2026-12-31")
+    parser.add_argument("--cold", action="store_true", help="vary the range so the cache cannot answer")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="also write the report to this JSON file")
+    args = parser.parse_args()
+
+    try:
+        report = run(args.url, args.concurrency, args.requests, args.batch, args.start, args.end,
+                     args.cold, args.seed)
+    except ConnectionError as exc:
+        print(f"⚠️ Cannot reach the service at {args.url}: {exc}")
+        sys.exit(1)
+
+    service = report["service"]
+    print(f"{report['requests']} requests in {report['elapsed_s']:.2f}s: "
+          f"{report['requests_per_s']:.0f} req/s, statuses {report['statuses']}")
+    print(f"latency p50 {report['latency_p50_ms']:.1f} ms, p95 {report['latency_p95_ms']:.1f} ms, "
+          f"p99 {report['latency_p99_ms']:.1f} ms")
+    print(f"service: {service['counts'].get('batches', 0)} batches, "
+          f"{service['mean_batch_requests'] or 0:.1f} requests per batch, "
+          f"cache hit rate {service['cache_hit_rate'] or 0:.0%}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Report saved to {args.out}")
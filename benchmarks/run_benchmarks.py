@@ -0,0 +1,219 @@
+"""
+Benchmarks for the data and prediction hot paths.
+
+    python benchmarks/run_benchmarks.py --scales 1 10            # time and write results JSON
+    python benchmarks/run_benchmarks.py --save-baseline          # also store them as the baseline
+    python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json --tolerance 0.2
+
+Each scale uses the synthetic datasets from synthetic.py (generated on first
+use). Timed per scale:
+
+    clean_parse       clean.ingest() of the raw export (full rebuild, one worker)
+    dataset_load      reading the cleaned CSV into a VillageDataset
+    village_filter    VillageDataset.village() for sampled villages (per call)
+    predict_short     get_predictions() over 2 years for sampled villages (per call)
+    predict_long      get_predictions() over 10 years for sampled villages (per call)
+    scenarios         scenarios.simulate() of 1000 scenarios over 2 years (per village)
+    recharge_summary  the dashboard's recharge resample and mean/min/max (per village)
+    aggregate_cube    AggregateCube.build() over the whole dataset
+
+and once, independent of scale:
+
+    model_load        load_model_file() of the global model and sampled village models
+
+Every benchmark reports the median and minimum of --repeats runs. Results
+are keyed "<benchmark>@x<scale>"; with --baseline, any median slower than
+the baseline's by more than --tolerance is reported and the exit code is 1.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+here = os.path.dirname(os.path.abspath(__file__))
+root = os.path.dirname(here)
+sys.path.insert(0, os.path.join(root, "app"))
+sys.path.insert(0, root)
+
+import clean  # noqa: E402
+import predict_future  # noqa: E402
+from aggregates import AggregateCube  # noqa: E402
+from data_access import VillageDataset  # noqa: E402
+from model_registry import MODEL_SUFFIX, load_model_file, models_dir  # noqa: E402
+from scenarios import simulate  # noqa: E402
+from synthetic import generate  # noqa: E402
+
+baseline_path = os.path.join(here, "baseline.json")
+results_dir = os.path.join(here, "results")
+
+SAMPLE_VILLAGES = 20
+SAMPLE_MODELS = 20
+SCENARIOS = 1000
+
+
+def measure(fn, repeats, per_call=1):
+    """Median and minimum seconds of fn() over repeats runs, divided by per_call."""
+    fn()  # warm-up
+    times = []
+    for _ in range(repeats):
+        t = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t) / per_call)
+    return {"median_s": float(np.median(times)), "min_s": float(np.min(times)), "repeats": repeats}
+
+
+def _sample(items, n, seed=0):
+    rng = np.random.default_rng(seed)
+    items = list(items)
+    return [items[i] for i in rng.choice(len(items), size=min(n, len(items)), replace=False)]
+
+
+def bench_scale(scale, repeats, skip_clean=False):
+    """Results for one synthetic scale, keyed by benchmark name."""
+    csv_path, raw_path = generate(scale)
+    results = {}
+
+    if not skip_clean:
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "cleaned.csv")
+            results["clean_parse"] = measure(lambda: clean.ingest(raw_path, out, full=True), repeats)
+
+    results["dataset_load"] = measure(lambda: VillageDataset(pd.read_csv(csv_path)), repeats)
+    dataset = VillageDataset(pd.read_csv(csv_path))
+    villages = _sample(dataset.villages, SAMPLE_VILLAGES)
+
+    def filter_villages():
+        for v in villages:
+            dataset.village(v)
+    results["village_filter"] = measure(filter_villages, repeats, len(villages))
+
+    # get_predictions and simulate read the module's dataset; point it at the synthetic one
+    original = predict_future.dataset, predict_future.df
+    predict_future.dataset, predict_future.df = dataset, dataset.df
+    try:
+        for name, end in (("predict_short", "2026-12-31"), ("predict_long", "2034-12-31")):
+            def predict(end=end):
+                # get_predictions prints the village and range on every call
+                with contextlib.redirect_stdout(io.StringIO()):
+                    for v in villages:
+                        predict_future.get_predictions(v, "2025-01-01", end)
+            results[name] = measure(predict, repeats, len(villages))
+        results["scenarios"] = measure(lambda: simulate(villages, "2025-01-01", "2026-12-31", SCENARIOS),
+                                       repeats, len(villages))
+    finally:
+        predict_future.dataset, predict_future.df = original
+
+    def recharge_summary():
+        for v in villages:
+            data = dataset.village(v)
+            data[["DTWL"]].agg(["mean", "min", "max"])
+            recharge = data.sort_values("Date").copy()
+            recharge["Recharge"] = recharge["DTWL"].shift(1) - recharge["DTWL"]
+            recharge.set_index("Date")[["Recharge"]].resample("M").sum()
+    results["recharge_summary"] = measure(recharge_summary, repeats, len(villages))
+
+    results["aggregate_cube"] = measure(lambda: AggregateCube.build(dataset.df), repeats)
+
+    rows = len(dataset.df)
+    for r in results.values():
+        r["rows"] = rows
+        r["villages"] = len(dataset.villages)
+    return results
+
+
+def bench_models(repeats):
+    paths = [os.path.join(models_dir, f) for f in os.listdir(models_dir) if f.endswith(MODEL_SUFFIX)]
+    sample = []
+    for p in _sample(paths, len(paths)):
+        if len(sample) == SAMPLE_MODELS:
+            break
+        # Skip stubs and models this scikit-learn cannot unpickle
+        try:
+            load_model_file(p)
+        except Exception:
+            continue
+        sample.append(p)
+
+    def load():
+        for p in sample:
+            load_model_file(p)
+    results = {"model_load_global": measure(lambda: load_model_file(predict_future.model_path), repeats)}
+    if sample:
+        results["model_load_village"] = measure(load, repeats, len(sample))
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """(key, baseline median, current median) for every benchmark slower than allowed."""
+    regressions = []
+    for key, current in results.items():
+        before = baseline.get("results", {}).get(key)
+        if before and current["median_s"] > before["median_s"] * (1 + tolerance):
+            regressions.append((key, before["median_s"], current["median_s"]))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the data and prediction hot paths on synthetic datasets")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100, 1000], help="dataset copies")
+    parser.add_argument("--repeats", type=int, default=3, help="timed runs per benchmark")
+    parser.add_argument("--skip-clean", action="store_true", help="skip the raw export parsing benchmark")
+    parser.add_argument("--out", help="results JSON (default: benchmarks/results/<time>.json)")
+    parser.add_argument("--baseline", help="compare against this results JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline")
+    parser.add_argument("--save-baseline", action="store_true", help=f"also write the results to {baseline_path}")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+    results = {}
+    results.update(bench_models(args.repeats))
+    for scale in args.scales:
+        for name, r in bench_scale(scale, args.repeats, args.skip_clean).items():
+            results[f"{name}@x{scale}"] = r
+    for key, r in results.items():
+        print(f"{key}: {1000 * r['median_s']:.3f} ms")
+
+    report = {"environment": environment(), "results": results}
+    out = args.out or os.path.join(results_dir, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results saved to {out}")
+    if args.save_baseline:
+        with open(baseline_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Baseline saved to {baseline_path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for key, before, after in regressions:
+            print(f"⚠️ Regression in {key}: {1000 * before:.3f} ms -> {1000 * after:.3f} ms")
+        if regressions:
+            sys.exit(1)
+        print("✅ No regressions against the baseline")
@@ -0,0 +1,99 @@
+"""
+Synthetic scale-up datasets for the benchmarks.
+
+A dataset at scale N is N copies of the real cleaned dataset. Copy i renames
+every village to <Village>R<i>, moves its coordinates by up to ~5 km and adds
+noise to DTWL, so the village count, rows per village and value distribution
+scale together. The same rows are written as a cleaned CSV in the
+monsoon_cleaned.csv schema and as a raw export in the dataset1.txt format.
+
+    python benchmarks/synthetic.py --scales 1 10 100
+
+Files go to benchmarks/data/monsoon_x<N>.csv and dataset_x<N>.txt and are
+reused when they already exist.
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from data_access import dataset_path  # noqa: E402
+
+data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+RAW_HEADER = "STATE_UT,DISTRICT,BLOCK,VILLAGE,LATITUDE LONGITUDE,Date,DTWL\n"
+
+SEED = 42
+
+
+def synthetic_paths(scale, directory=data_dir):
+    return (os.path.join(directory, f"monsoon_x{scale}.csv"),
+            os.path.join(directory, f"dataset_x{scale}.txt"))
+
+
+def _template(path=dataset_path):
+    df = pd.read_csv(path)
+    for col in ["STATE_UT", "DISTRICT", "BLOCK", "VILLAGE"]:
+        df[col] = df[col].fillna("").astype(str).str.strip()
+    # Raw lines split the text on spaces: BLOCK and VILLAGE must be single words
+    df["BLOCK"] = df["BLOCK"].str.replace(" ", "", regex=False)
+    df["VILLAGE"] = df["VILLAGE"].str.replace(" ", "", regex=False)
+    df["Date"] = pd.to_datetime(df["Date"])
+    return df
+
+
+def _replica(template, i, rng):
+    df = template.copy()
+    if i:
+        df["VILLAGE"] = df["VILLAGE"] + f"R{i}"
+        # One coordinate shift per village, so each stays a single station
+        villages, codes = np.unique(df["VILLAGE"].to_numpy(), return_inverse=True)
+        shift = rng.uniform(-0.05, 0.05, size=(len(villages), 2))
+        df["LATITUDE"] = (df["LATITUDE"] + shift[codes, 0]).round(4)
+        df["LONGITUDE"] = (df["LONGITUDE"] + shift[codes, 1]).round(4)
+        df["DTWL"] = (df["DTWL"] * rng.uniform(0.9, 1.1, size=len(df))).round(2)
+    return df
+
+
+def _raw_lines(df):
+    return (
+        df["STATE_UT"] + " " + df["DISTRICT"] + " " + df["BLOCK"] + " " + df["VILLAGE"] + " "
+        + df["LATITUDE"].map("{:.5f}".format) + " " + df["LONGITUDE"].map("{:.5f}".format) + " "
+        + df["Date"].dt.strftime("%d-%m-%y") + " " + df["DTWL"].astype(str) + "\n"
+    )
+
+
+def generate(scale, directory=data_dir, force=False):
+    """Write the scale-N cleaned CSV and raw export (one replica at a time); returns their paths."""
+    csv_path, raw_path = synthetic_paths(scale, directory)
+    if not force and os.path.exists(csv_path) and os.path.exists(raw_path):
+        return csv_path, raw_path
+
+    os.makedirs(directory, exist_ok=True)
+    template = _template()
+    rng = np.random.default_rng(SEED)
+    with open(csv_path + ".tmp", "w") as csv_file, open(raw_path + ".tmp", "w") as raw_file:
+        raw_file.write(RAW_HEADER)
+        for i in range(scale):
+            df = _replica(template, i, rng)
+            df.to_csv(csv_file, header=(i == 0), index=False, date_format="%Y-%m-%d")
+            raw_file.writelines(_raw_lines(df))
+    os.replace(csv_path + ".tmp", csv_path)
+    os.replace(raw_path + ".tmp", raw_path)
+    return csv_path, raw_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic scale-up datasets")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100, 1000], help="copies of the dataset")
+    parser.add_argument("--out", default=data_dir, help="directory for the generated files")
+    parser.add_argument("--force", action="store_true", help="regenerate existing files")
+    args = parser.parse_args()
+
+    for scale in args.scales:
+        csv_path, raw_path = generate(scale, args.out, args.force)
+        print(f"✅ x{scale}: {csv_path}, {raw_path}")
@@ -1,42 +1,270 @@
-import pandas as pd
+import argparse
+import hashlib
+import json
+import os
 import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+# Raw CGWB-style export and the cleaned CSV written from it
+SOURCE_PATH = "/Users/sruthiuma/Documents/fold2/dataset1.txt"
+OUTPUT_PATH = "monsoon_cleaned.csv"
+
+COLUMNS = ["STATE_UT", "DISTRICT", "BLOCK", "VILLAGE", "LATITUDE", "LONGITUDE", "Date", "DTWL"]
+
+# Match last 4 numeric/date fields
+LINE_RE = re.compile(r'^(.*)\s+([\d.]+)\s+([\d.]+)\s+(\d{2}-\d{2}-\d{2})\s+([\d.]+)$')
 
-# Load your current text file
-with open("/Users/sruthiuma/Documents/fold2/dataset1.txt", "r") as f:
-    lines = f.readlines()
+# Columnar copy: Parquet partitioned by district, written with pyarrow when requested
+COLUMNAR_MARKER = "_COMPLETE"
+COLUMNAR_ROW_GROUP = 4096
 
-cleaned_rows = []
+CHUNK_BYTES = 8 * 1024 * 1024
+HEAD_BYTES = 64 * 1024  # prefix checksummed to detect a replaced (not appended) source
 
-for line in lines[1:]:  # skip header if present
+
+def parse_line(line):
+    """Return ([STATE_UT, DISTRICT, BLOCK, VILLAGE, lat, lon, date, dtwl], None) or (None, reason)."""
     line = line.strip()
-    # Match last 4 numeric/date fields
-    match = re.match(r'^(.*)\s+([\d.]+)\s+([\d.]+)\s+(\d{2}-\d{2}-\d{2})\s+([\d.]+)$', line)
-    if match:
-        text_part, lat, lon, date, dtwl = match.groups()
-        text_fields = text_part.split()
-        # STATE_UT: first 2 words
-        STATE_UT = " ".join(text_fields[:2])
-        # BLOCK: second-to-last text field
-        BLOCK = text_fields[-2]
-        # VILLAGE: last text field
-        VILLAGE = text_fields[-1]
-        # DISTRICT: everything in between
-        DISTRICT = " ".join(text_fields[2:-2])
-        cleaned_rows.append([STATE_UT, DISTRICT, BLOCK, VILLAGE, lat, lon, date, dtwl])
-
-# Create DataFrame
-df = pd.DataFrame(cleaned_rows, columns=[
-    "STATE_UT","DISTRICT","BLOCK","VILLAGE","LATITUDE","LONGITUDE","Date","DTWL"
-])
-
-# Convert numeric/date columns
-df["LATITUDE"] = pd.to_numeric(df["LATITUDE"])
-df["LONGITUDE"] = pd.to_numeric(df["LONGITUDE"])
-df["DTWL"] = pd.to_numeric(df["DTWL"])
-df["Date"] = pd.to_datetime(df["Date"], format="%d-%m-%y")
-
-# Save as CSV
-df.to_csv("monsoon_cleaned.csv", index=False)
-
-print("✅ Saved as monsoon_cleaned.csv")
-print(df.head())
+    if not line:
+        return None, "blank line"
+    if line.startswith("STATE_UT"):
+        return None, "header"
+    match = LINE_RE.match(line)
+    if not match:
+        return None, "unparsed line"
+    text_part, lat, lon, date, dtwl = match.groups()
+    text_fields = text_part.split()
+    # STATE_UT: first 2 words
+    STATE_UT = " ".join(text_fields[:2])
+    # BLOCK: second-to-last text field
+    BLOCK = text_fields[-2]
+    # VILLAGE: last text field
+    VILLAGE = text_fields[-1]
+    # DISTRICT: everything in between
+    DISTRICT = " ".join(text_fields[2:-2])
+    return [STATE_UT, DISTRICT, BLOCK, VILLAGE, lat, lon, date, dtwl], None
+
+
+def parse_range(path, start, end):
+    """Parse the complete lines in bytes [start, end) of path.
+
+    Returns (rows, offsets, rejects): the byte offset of each parsed row and
+    the rejected lines as (byte offset, reason, line).
+    """
+    rows, offsets, rejects = [], [], []
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    offset = start
+    for raw in data.splitlines(keepends=True):
+        line = raw.decode("utf-8", errors="replace")
+        row, reason = parse_line(line)
+        if row is not None:
+            rows.append(row)
+            offsets.append(offset)
+        elif reason != "blank line":
+            rejects.append((offset, reason, line.rstrip("\r\n")))
+        offset += len(raw)
+    return rows, offsets, rejects
+
+
+def split_ranges(path, start, end, chunk_bytes):
+    """Split [start, end) into consecutive ranges of about chunk_bytes, each ending on a newline."""
+    ranges = []
+    with open(path, "rb") as f:
+        while start < end:
+            stop = min(start + chunk_bytes, end)
+            if stop < end:
+                f.seek(stop)
+                rest = f.readline()
+                stop = min(stop + len(rest), end)
+            ranges.append((start, stop))
+            start = stop
+    return ranges
+
+
+def complete_end(path, size):
+    """Offset just past the last newline; an unterminated last line is left for the next run."""
+    with open(path, "rb") as f:
+        pos = size
+        while pos > 0:
+            step = min(64 * 1024, pos)
+            f.seek(pos - step)
+            block = f.read(step)
+            i = block.rfind(b"\n")
+            if i != -1:
+                return pos - step + i + 1
+            pos -= step
+    return 0
+
+
+def head_checksum(path, length):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read(min(length, HEAD_BYTES))).hexdigest()
+
+
+def read_line(path, offset):
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.readline().decode("utf-8", errors="replace").rstrip("\r\n")
+
+
+def to_frame(path, rows, offsets, rejects):
+    """Typed DataFrame for parsed rows; rows with impossible dates move to rejects."""
+    df = pd.DataFrame(rows, columns=COLUMNS)
+
+    # Convert numeric/date columns
+    df["LATITUDE"] = pd.to_numeric(df["LATITUDE"])
+    df["LONGITUDE"] = pd.to_numeric(df["LONGITUDE"])
+    df["DTWL"] = pd.to_numeric(df["DTWL"])
+    df["Date"] = pd.to_datetime(df["Date"], format="%d-%m-%y", errors="coerce")
+
+    bad = df["Date"].isna()
+    for i in bad[bad].index:
+        rejects.append((offsets[i], "invalid date", read_line(path, offsets[i])))
+    return df[~bad]
+
+
+def write_columnar(df, root, part_name):
+    """Append df to the district-partitioned Parquet store at root.
+
+    Location columns are dictionary-encoded, DTWL/LATITUDE/LONGITUDE are
+    float32 and Date is a native timestamp. Rows are sorted by village and
+    date so row-group statistics let readers skip other villages.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    location = pa.dictionary(pa.int32(), pa.string())
+    schema = pa.schema([
+        ("STATE_UT", location),
+        ("DISTRICT", pa.string()),
+        ("BLOCK", location),
+        ("VILLAGE", location),
+        ("LATITUDE", pa.float32()),
+        ("LONGITUDE", pa.float32()),
+        ("Date", pa.timestamp("ns")),
+        ("DTWL", pa.float32()),
+    ])
+    df = df.sort_values(["DISTRICT", "VILLAGE", "Date"], kind="stable")
+    table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+    ds.write_dataset(
+        table, root, format="parquet",
+        partitioning=ds.partitioning(pa.schema([("DISTRICT", pa.string())]), flavor="hive"),
+        basename_template=part_name + "-{i}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        max_rows_per_group=COLUMNAR_ROW_GROUP,
+        min_rows_per_group=0,
+        file_options=ds.ParquetFileFormat().make_write_options(compression="zstd"),
+    )
+
+
+def _parse_chunk(args):
+    return parse_range(*args)
+
+
+def ingest(source=SOURCE_PATH, output=OUTPUT_PATH, workers=1, chunk_bytes=CHUNK_BYTES, full=False,
+           columnar=None):
+    """Parse source into output, only reading lines appended since the last run.
+
+    A watermark (<output>.watermark.json) records how far the source has been
+    parsed. Rejected lines go to <output>.quarantine.csv with a reason. The
+    source is parsed in chunks, across a process pool when workers > 1.
+    When columnar is a directory, the same rows are also written there as a
+    district-partitioned Parquet store (see write_columnar).
+    """
+    watermark_path = output + ".watermark.json"
+    quarantine_path = output + ".quarantine.csv"
+
+    size = os.path.getsize(source)
+    end = complete_end(source, size)
+
+    start = 0
+    columnar_ready = columnar is None or os.path.exists(os.path.join(columnar, COLUMNAR_MARKER))
+    if not full and columnar_ready and os.path.exists(watermark_path) and os.path.exists(output):
+        with open(watermark_path) as f:
+            mark = json.load(f)
+        if (mark.get("source") == os.path.abspath(source) and mark["offset"] <= end
+                and mark["head_checksum"] == head_checksum(source, mark["offset"])):
+            start = mark["offset"]
+    if start == 0:
+        for path in (output, quarantine_path):
+            if os.path.exists(path):
+                os.remove(path)
+        if columnar is not None and os.path.isdir(columnar):
+            shutil.rmtree(columnar)
+
+    ranges = split_ranges(source, start, end, chunk_bytes)
+    tasks = [(source, a, b) for a, b in ranges]
+
+    n_rows = n_rejects = 0
+    write_header = not os.path.exists(output)
+    write_q_header = not os.path.exists(quarantine_path)
+
+    def save_watermark(offset):
+        with open(watermark_path, "w") as f:
+            json.dump({
+                "source": os.path.abspath(source),
+                "offset": offset,
+                "head_checksum": head_checksum(source, offset),
+            }, f)
+
+    def run(results):
+        nonlocal n_rows, n_rejects, write_header, write_q_header
+        for (a, b), (rows, offsets, rejects) in zip(ranges, results):
+            df = to_frame(source, rows, offsets, rejects)
+            df.to_csv(output, mode="a", header=write_header, index=False)
+            write_header = False
+            n_rows += len(df)
+            if columnar is not None and len(df):
+                write_columnar(df, columnar, f"part-{a:012d}")
+
+            if rejects:
+                q = pd.DataFrame(rejects, columns=["offset", "reason", "line"])
+                q.to_csv(quarantine_path, mode="a", header=write_q_header, index=False)
+                write_q_header = False
+                n_rejects += len(rejects)
+
+            # Advance after every chunk so an interrupted run resumes where it stopped
+            save_watermark(b)
+
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            run(pool.map(_parse_chunk, tasks))
+    else:
+        run(map(_parse_chunk, tasks))
+
+    if write_header:
+        # Nothing parsed yet: still leave a valid CSV behind
+        pd.DataFrame(columns=COLUMNS).to_csv(output, index=False)
+
+    save_watermark(end)
+    if columnar is not None:
+        os.makedirs(columnar, exist_ok=True)
+        with open(os.path.join(columnar, COLUMNAR_MARKER), "w") as f:
+            f.write(str(end))
+
+    return {"start": start, "end": end, "rows": n_rows, "rejected": n_rejects, "tail_bytes": size - end}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean a raw DTWL export into monsoon_cleaned.csv")
+    parser.add_argument("source", nargs="?", default=SOURCE_PATH, help="raw text export")
+    parser.add_argument("-o", "--output", default=OUTPUT_PATH, help="cleaned CSV to write/append to")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="parser processes")
+    parser.add_argument("--chunk-mb", type=float, default=CHUNK_BYTES / (1024 * 1024), help="chunk size in MB")
+    parser.add_argument("--full", action="store_true", help="ignore the watermark and rebuild from scratch")
+    parser.add_argument("--parquet", metavar="DIR", help="also write a district-partitioned Parquet store")
+    args = parser.parse_args()
+
+    stats = ingest(args.source, args.output, args.workers, int(args.chunk_mb * 1024 * 1024), args.full,
+                   args.parquet)
+
+    print(f"✅ Saved as {args.output}")
+    print(f"Parsed bytes {stats['start']}-{stats['end']}: {stats['rows']} rows, "
+          f"{stats['rejected']} lines quarantined")
+    if stats["tail_bytes"]:
+        print(f"Left {stats['tail_bytes']} bytes of an unterminated last line for the next run")